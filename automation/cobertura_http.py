@@ -0,0 +1,291 @@
+#
+# MOTOR HTTP PARA INCLUSÃO DE COBERTURAS NO PORTAL SDWAN (SEM NAVEGADOR)
+#
+# Reproduz direto as requisições que a página de cobertura faz: login uma
+# única vez, "Localizar Ponto" e "Incluir Cobertura" por cidade, em conexões
+# keep-alive reaproveitadas, com várias cidades em paralelo sob um limite de
+# requisições por segundo. Para testar sem o portal: servidor_sdwan_local.py.
+#
+
+import os
+import json
+import time
+import queue
+import threading
+import http.client
+from http.cookies import SimpleCookie
+from urllib.parse import urlsplit, urljoin, urlencode, parse_qsl
+from concurrent.futures import ThreadPoolExecutor
+
+from insert_cobertura_provedor import (
+    URL_SDWAN, SD_USER, SD_PASS, URL_ADD_COBERTURA, TECNOLOGIA,
+    SUCESSO, FALHOU, SEM_CONFIRMACAO, InclusaoNaoConfirmada,
+    Cronometro, Progresso, Trabalho, fila_de_trabalhos, relatorios_por_trabalho
+)
+
+# ================================
+# SETUP
+# ================================
+# Endereços das requisições (aba Rede do navegador). O login e a inclusão
+# vão, por padrão, para as mesmas URLs usadas pelo navegador.
+URL_API_LOGIN = os.getenv("URL_API_LOGIN") or URL_SDWAN
+URL_API_LOCALIZAR = os.getenv("URL_API_LOCALIZAR")
+URL_API_INCLUIR = os.getenv("URL_API_INCLUIR") or URL_ADD_COBERTURA
+# Trecho da resposta que confirma a inclusão (vazio: basta o status HTTP)
+TEXTO_SUCESSO = os.getenv("TEXTO_SUCESSO_COBERTURA", "")
+
+# Requisições simultâneas e máximo por segundo (somando todas)
+CONCORRENCIA = 8
+TAXA_MAXIMA = 10.0
+TIMEOUT = 10
+
+# Etapas cronometradas por cidade (espera: fila do limite de requisições)
+ETAPAS = ("espera", "localizar", "incluir")
+
+class FalhaPortal(Exception):
+    """Resposta inesperada do portal (login, localização ou inclusão)."""
+
+# ================================
+# SESSÃO HTTP (pool keep-alive)
+# ================================
+class SessaoPortal:
+    """
+    Cookies da sessão do portal e um pool de conexões persistentes com o
+    servidor: cada requisição pega uma conexão livre e a devolve ao terminar.
+    """
+
+    def __init__(self, url_base, conexoes=CONCORRENCIA, timeout=TIMEOUT):
+        partes = urlsplit(url_base)
+        self.esquema = partes.scheme or "http"
+        self.servidor = partes.netloc
+        self.timeout = timeout
+        self.cookies = SimpleCookie()
+        self._trava_cookies = threading.Lock()
+        self._livres = queue.LifoQueue()
+        for _ in range(conexoes):
+            self._livres.put(None)
+
+    def _nova_conexao(self):
+        classe = http.client.HTTPSConnection if self.esquema == "https" else http.client.HTTPConnection
+        return classe(self.servidor, timeout=self.timeout)
+
+    def _cabecalho_cookies(self):
+        with self._trava_cookies:
+            return "; ".join(f"{nome}={morsel.value}" for nome, morsel in self.cookies.items())
+
+    def requisitar(self, metodo, url, campos=None, repetir=True):
+        """
+        Envia a requisição (campos como formulário) e retorna (status,
+        cabeçalhos, corpo). Uma conexão derrubada pelo servidor é refeita
+        uma vez, só com repetir=True: sem ele (requisições que não podem ser
+        repetidas, como a inclusão), o erro de conexão é levantado.
+        """
+        partes = urlsplit(urljoin(f"{self.esquema}://{self.servidor}/", url))
+        if partes.netloc != self.servidor:
+            raise FalhaPortal(f"URL fora do portal: {url}")
+        caminho = partes.path or "/"
+        if partes.query:
+            caminho += "?" + partes.query
+
+        corpo = urlencode(campos or {}).encode("utf-8") if metodo == "POST" else None
+        cabecalhos = {"Connection": "keep-alive"}
+        if corpo is not None:
+            cabecalhos["Content-Type"] = "application/x-www-form-urlencoded"
+        cookies = self._cabecalho_cookies()
+        if cookies:
+            cabecalhos["Cookie"] = cookies
+
+        conexao = self._livres.get()
+        try:
+            tentativas = 2 if repetir else 1
+            for tentativa in range(1, tentativas + 1):
+                if conexao is None:
+                    conexao = self._nova_conexao()
+                try:
+                    conexao.request(metodo, caminho, body=corpo, headers=cabecalhos)
+                    resposta = conexao.getresponse()
+                    conteudo = resposta.read()
+                    break
+                except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                    conexao.close()
+                    conexao = None
+                    if tentativa == tentativas:
+                        raise
+            if resposta.will_close:
+                conexao.close()
+                conexao = None
+        except Exception:
+            if conexao is not None:
+                conexao.close()
+            conexao = None
+            raise
+        finally:
+            self._livres.put(conexao)
+
+        for valor in resposta.msg.get_all("Set-Cookie") or []:
+            with self._trava_cookies:
+                self.cookies.load(valor)
+
+        charset = resposta.headers.get_content_charset() or "utf-8"
+        texto = conteudo.decode(charset, errors="replace")
+        return resposta.status, {k.lower(): v for k, v in resposta.getheaders()}, texto
+
+    def login(self, usuario, senha, url=None):
+        # Mesmos campos do formulário de login (set_Login/set_pass)
+        status, cabecalhos, _ = self.requisitar(
+            "POST", url or URL_API_LOGIN, {"set_Login": usuario, "set_pass": senha}
+        )
+        # Como no navegador: o login é confirmado pelo redirecionamento ao portal
+        if "portal.html" not in cabecalhos.get("location", ""):
+            raise FalhaPortal(f"Login recusado (HTTP {status}).")
+
+    def fechar(self):
+        while not self._livres.empty():
+            conexao = self._livres.get_nowait()
+            if conexao is not None:
+                conexao.close()
+
+# ================================
+# LIMITE DE REQUISIÇÕES POR SEGUNDO
+# ================================
+class LimiteTaxa:
+    """Espaça as requisições de todas as threads em no máximo `por_segundo`."""
+
+    def __init__(self, por_segundo):
+        self.intervalo = 1.0 / por_segundo if por_segundo else 0.0
+        self._proxima = time.monotonic()
+        self._trava = threading.Lock()
+
+    def aguardar(self):
+        if not self.intervalo:
+            return
+        with self._trava:
+            agora = time.monotonic()
+            horario = max(self._proxima, agora)
+            self._proxima = horario + self.intervalo
+        if horario > agora:
+            time.sleep(horario - agora)
+
+# ================================
+# LOCALIZAR PONTO / INCLUIR COBERTURA
+# ================================
+def _campos_resposta(texto):
+    # A localização devolve os campos preenchidos na página (JSON ou formulário)
+    try:
+        dados = json.loads(texto)
+    except ValueError:
+        dados = dict(parse_qsl(texto))
+    if not isinstance(dados, dict):
+        return {}
+    return {str(k): "" if v is None else str(v) for k, v in dados.items()}
+
+def _redireciona_ao_login(destino):
+    caminho = urlsplit(urljoin(URL_API_LOGIN or "", destino)).path
+    return caminho == urlsplit(URL_API_LOGIN or "").path or "login" in caminho.lower()
+
+def _verificar_resposta(etapa, status, cabecalhos):
+    """
+    Só uma resposta 2xx conta: um redirecionamento (sessão expirada, que o
+    portal manda ao login) ou um erro HTTP viram FalhaPortal.
+    """
+    if 200 <= status < 300:
+        return
+    destino = cabecalhos.get("location", "")
+    if destino and _redireciona_ao_login(destino):
+        raise FalhaPortal(f"{etapa}: sessão expirada, redirecionado ao login (HTTP {status})")
+    if destino:
+        raise FalhaPortal(f"{etapa}: redirecionado para {destino} (HTTP {status})")
+    raise FalhaPortal(f"{etapa}: HTTP {status}")
+
+def localizar_ponto(sessao, valor_concat):
+    """Geocodifica o endereço; retorna os campos (cb_Cidade, ...) do ponto."""
+    status, cabecalhos, texto = sessao.requisitar("POST", URL_API_LOCALIZAR, {"address": valor_concat})
+    _verificar_resposta("Localizar Ponto", status, cabecalhos)
+    campos = _campos_resposta(texto)
+    # Mesma condição que o navegador espera: cb_Cidade preenchido
+    if not campos.get("cb_Cidade", "").strip():
+        raise FalhaPortal("Localizar Ponto: cidade não encontrada")
+    return campos
+
+def url_inclusao(url_pagina):
+    # A página padrão (URL_ADD_COBERTURA) pode enviar o formulário a outra URL
+    return URL_API_INCLUIR if url_pagina in (None, URL_ADD_COBERTURA) else url_pagina
+
+def incluir_cobertura(sessao, valor_concat, campos_ponto, tecnologia=TECNOLOGIA, url=None):
+    """
+    Envia o formulário de inclusão; retorna a mensagem do portal. A conexão
+    caída no meio não é repetida (o portal pode já ter incluído): levanta
+    InclusaoNaoConfirmada.
+    """
+    formulario = dict(campos_ponto)
+    formulario.update({"cb_nome": valor_concat, "cb_Tecnologia": tecnologia, "address": valor_concat})
+    try:
+        status, cabecalhos, texto = sessao.requisitar(
+            "POST", url or URL_API_INCLUIR, formulario, repetir=False
+        )
+    except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError) as e:
+        raise InclusaoNaoConfirmada(
+            f"Conexão encerrada durante Incluir Cobertura ({type(e).__name__}) — verificar no portal"
+        ) from None
+    _verificar_resposta("Incluir Cobertura", status, cabecalhos)
+    if TEXTO_SUCESSO and TEXTO_SUCESSO not in texto:
+        raise FalhaPortal(f"Incluir Cobertura: resposta inesperada — {texto.strip()[:200]}")
+    return texto.strip()[:200] or f"HTTP {status}"
+
+# ================================
+# EXECUÇÃO EM PARALELO
+# ================================
+def incluir_trabalhos_http(trabalhos, concorrencia=None, taxa=None, diario=None):
+    """
+    Mesmo resultado de incluir_trabalhos (um relatório por trabalho,
+    resultados no diário), sem navegador: um login para a fila inteira e até
+    `concorrencia` cidades em andamento, limitadas a `taxa` requisições por
+    segundo.
+    """
+    if not URL_API_LOCALIZAR:
+        raise FalhaPortal("Defina URL_API_LOCALIZAR no .env para usar o motor HTTP.")
+
+    concorrencia = max(1, concorrencia or CONCORRENCIA)
+    limite = LimiteTaxa(TAXA_MAXIMA if taxa is None else taxa)
+    sessao = SessaoPortal(URL_API_LOGIN, concorrencia)
+    itens = fila_de_trabalhos(trabalhos)
+    progresso = Progresso(len(itens), diario, trabalhos)
+
+    def processar(posicao, trabalho, cidade, estado):
+        valor_concat = f"{cidade} - {estado}"
+        cronometro = Cronometro()
+        try:
+            with cronometro.etapa("espera"):
+                limite.aguardar()
+            with cronometro.etapa("localizar"):
+                campos = localizar_ponto(sessao, valor_concat)
+            with cronometro.etapa("espera"):
+                limite.aguardar()
+            with cronometro.etapa("incluir"):
+                mensagem = incluir_cobertura(
+                    sessao, valor_concat, campos, trabalho.tecnologia, url_inclusao(trabalho.url)
+                )
+        except InclusaoNaoConfirmada as e:
+            progresso.registrar("HTTP", cidade, estado, SEM_CONFIRMACAO, e, trabalho)
+            return (posicao, cidade, estado, "HTTP", SEM_CONFIRMACAO, str(e), cronometro.tempos)
+        except Exception as e:
+            progresso.registrar("HTTP", cidade, estado, FALHOU, e, trabalho)
+            return (posicao, cidade, estado, "HTTP", FALHOU, str(e), cronometro.tempos)
+        progresso.registrar("HTTP", cidade, estado, SUCESSO, mensagem, trabalho)
+        return (posicao, cidade, estado, "HTTP", SUCESSO, mensagem, cronometro.tempos)
+
+    try:
+        sessao.login(SD_USER, SD_PASS)
+        print("Login concluído. Redirecionamento detectado.")
+        with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+            resultados = list(executor.map(lambda item: processar(*item), itens))
+    finally:
+        sessao.fechar()
+
+    return relatorios_por_trabalho(trabalhos, resultados, ETAPAS)
+
+def incluir_coberturas_http(cidades, concorrencia=None, taxa=None, diario=None, url=None, tecnologia=None):
+    """incluir_trabalhos_http para uma única lista [(cidade, estado)]; retorna o relatório."""
+    return incluir_trabalhos_http(
+        [Trabalho("", cidades, url, tecnologia)], concorrencia, taxa, diario
+    )[0]
@@ -1,17 +1,41 @@
+import io
 import os
 import re
-from tkinter import (
-    Tk, Label, Entry, Button,
-    messagebox, filedialog, ttk
-)
-from openpyxl import load_workbook
-import pandas as pd
+import json
+import sys
+import hashlib
+import argparse
+import posixpath
+import zipfile
+from copy import copy
+from collections import deque
+from itertools import islice
+from contextlib import ExitStack
+from xml.etree import ElementTree
+
+from planilhas import abrir_planilha, normalizar_cabecalhos
+from manifesto import arquivo_inalterado, carregar_manifesto, registro_manifesto, salvar_manifesto
+
+# tkinter, openpyxl e pandas são importados apenas nas funções que os usam:
+# o módulo pode ser importado (e usado pela linha de comando) em máquinas sem
+# interface gráfica, e a geração de uma folha pelo caminho rápido não paga o
+# custo dessas bibliotecas.
 
 # ================= CONFIGURAÇÕES =================
 
 MODELO_PATH = "../data/static/FR_Modelo.xlsx"
 OUTDIR = "../outdir"
 
+# Geração em lote: número de processos e de linhas enviadas a cada tarefa
+TRABALHADORES_LOTE = os.cpu_count() or 1
+TAMANHO_BLOCO_LOTE = 64
+
+# Validação: linhas do lote convertidas em DataFrame por vez
+TAMANHO_BLOCO_VALIDACAO = 5000
+
+# Manifesto da geração em lote (arquivo de saída -> hash da linha e do modelo)
+MANIFESTO_NOME = ".manifesto_lote.json"
+
 CAMPOS_CELULAS = {
     "Designação": "B1",
     "ID Contrato": "B3",
@@ -60,25 +84,190 @@ CAMPOS_VALOR = {
     "Quanto Cobramos Instalação"
 }
 
-# ================= FUNÇÃO CENTRAL =================
+# Caracteres de controle não aceitos em XML (mesmo critério do openpyxl)
+ILLEGAL_CHARACTERS_RE = re.compile(r"[\000-\010]|[\013-\014]|[\016-\037]")
 
-def gerar_folha_dados(dados: dict):
-    wb = load_workbook(MODELO_PATH)
+# ================= CACHE DO MODELO =================
+
+# O modelo é lido do disco uma única vez por processo. Cada folha reaproveita
+# o mesmo workbook, restaurando antes os valores originais das células de
+# CAMPOS_CELULAS; a leitura só é refeita se o arquivo do modelo mudar (mtime).
+_cache_modelo = {"mtime": None, "wb": None, "originais": {}}
+
+def obter_modelo():
+    from openpyxl import load_workbook
+
+    mtime = os.stat(MODELO_PATH).st_mtime_ns
+
+    if _cache_modelo["wb"] is None or _cache_modelo["mtime"] != mtime:
+        wb = load_workbook(MODELO_PATH)
+        ws = wb.active
+        _cache_modelo["wb"] = wb
+        _cache_modelo["mtime"] = mtime
+        _cache_modelo["originais"] = {
+            celula: ws[celula].value for celula in CAMPOS_CELULAS.values()
+        }
+        return wb
+
+    # Devolve o workbook ao estado original do modelo
+    wb = _cache_modelo["wb"]
     ws = wb.active
+    for celula, valor in _cache_modelo["originais"].items():
+        ws[celula] = valor
+    return wb
+
+# ================= MODELO COMPILADO =================
+
+# Caminho rápido: o .xlsx do modelo é aberto uma única vez e separado em suas
+# partes (arquivos internos do zip). Para cada folha, apenas o XML da planilha
+# é remontado, com as células de CAMPOS_CELULAS trocadas por strings inline;
+# as demais partes são regravadas sem alteração. Se o modelo não puder ser
+# compilado, gerar_folha_dados usa o openpyxl (obter_modelo).
+NS_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+NS_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+NS_PKG_REL = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+_cache_compilado = {"mtime": None, "modelo": None}
+
+def _caminho_planilha_ativa(partes: dict) -> str:
+    workbook = ElementTree.fromstring(partes["xl/workbook.xml"])
+    rels = ElementTree.fromstring(partes["xl/_rels/workbook.xml.rels"])
+
+    view = workbook.find(f"{{{NS_MAIN}}}bookViews/{{{NS_MAIN}}}workbookView")
+    ativa = int(view.get("activeTab", 0)) if view is not None else 0
+    sheets = workbook.findall(f"{{{NS_MAIN}}}sheets/{{{NS_MAIN}}}sheet")
+    rid = sheets[ativa].get(f"{{{NS_REL}}}id")
+
+    for rel in rels.findall(f"{{{NS_PKG_REL}}}Relationship"):
+        if rel.get("Id") == rid:
+            alvo = rel.get("Target")
+            if alvo.startswith("/"):
+                return alvo.lstrip("/")
+            return posixpath.normpath(posixpath.join("xl", alvo))
+
+    raise ValueError(f"Relacionamento '{rid}' não encontrado no modelo.")
+
+def compilar_modelo(caminho: str) -> dict:
+    with zipfile.ZipFile(caminho) as zf:
+        infos = zf.infolist()
+        partes = {info.filename: zf.read(info) for info in infos}
+
+    nome_planilha = _caminho_planilha_ativa(partes)
+    xml = partes[nome_planilha].decode("utf-8")
+
+    # Localiza cada célula de destino, preservando o estilo (s="...")
+    encontrados = []
+    for campo, celula in CAMPOS_CELULAS.items():
+        m = re.search(
+            rf'<c r="{celula}"(?P<attrs>(?:\s[^>]*?)?)(?:/>|>.*?</c>)',
+            xml
+        )
+        if not m:
+            raise ValueError(f"Célula {celula} não encontrada no modelo.")
+        attrs = re.sub(r'\st="[^"]*"', "", m.group("attrs"))
+        encontrados.append((m.start(), m.end(), campo, f'<c r="{celula}"{attrs} t="inlineStr"><is><t xml:space="preserve">'))
+    encontrados.sort()
+
+    # Texto fixo intercalado com os pontos de inserção de cada campo
+    segmentos = []
+    campos = []
+    pos = 0
+    for inicio, fim, campo, abertura in encontrados:
+        if inicio < pos:
+            raise ValueError("Células sobrepostas no modelo.")
+        segmentos.append(xml[pos:inicio] + abertura)
+        campos.append(campo)
+        pos = fim
+    segmentos.append(xml[pos:])
+
+    return {
+        "infos": infos,
+        "partes": partes,
+        "planilha": nome_planilha,
+        "segmentos": segmentos,
+        "campos": campos
+    }
+
+def obter_modelo_compilado():
+    mtime = os.stat(MODELO_PATH).st_mtime_ns
+
+    if _cache_compilado["mtime"] != mtime:
+        try:
+            _cache_compilado["modelo"] = compilar_modelo(MODELO_PATH)
+        except (ValueError, KeyError, IndexError, zipfile.BadZipFile, ElementTree.ParseError):
+            # Modelo fora do padrão esperado: segue pelo openpyxl
+            _cache_compilado["modelo"] = None
+        _cache_compilado["mtime"] = mtime
+
+    return _cache_compilado["modelo"]
+
+def renderizar_folha(modelo: dict, valores: dict, destino):
+    segmentos = modelo["segmentos"]
+    pedacos = [segmentos[0]]
+    for campo, segmento in zip(modelo["campos"], segmentos[1:]):
+        pedacos.append(
+            valores[campo].replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+        )
+        pedacos.append("</t></is></c>")
+        pedacos.append(segmento)
+    xml_planilha = "".join(pedacos).encode("utf-8")
+
+    with zipfile.ZipFile(destino, "w") as zf:
+        for info in modelo["infos"]:
+            if info.filename == modelo["planilha"]:
+                zf.writestr(info, xml_planilha)
+            else:
+                zf.writestr(info, modelo["partes"][info.filename])
+
+# ================= FUNÇÃO CENTRAL =================
+
+def nome_arquivo_saida(dados: dict) -> str:
+    return f"{dados['Cliente Final']}.xlsx"
 
+def valores_folha(dados: dict) -> dict:
+    valores = {}
+    for campo in CAMPOS_CELULAS:
+        valor = dados.get(campo, "").strip()
+        valores[campo] = valor if valor else "-"
+    return valores
+
+def _validar_obrigatorios(dados: dict):
     for campo in CAMPOS_OBRIGATORIOS:
         if not dados.get(campo):
             raise ValueError(f"O campo obrigatório '{campo}' não foi preenchido.")
 
+def _gravar_folha(valores: dict, destino):
+    # destino: caminho do arquivo ou objeto de arquivo (ex.: BytesIO)
+    modelo = obter_modelo_compilado()
+    caracteres_invalidos = any(
+        ILLEGAL_CHARACTERS_RE.search(valor) for valor in valores.values()
+    )
+    if modelo is not None and not caracteres_invalidos:
+        renderizar_folha(modelo, valores, destino)
+        return
+
+    wb = obter_modelo()
+    ws = wb.active
     for campo, celula in CAMPOS_CELULAS.items():
-        valor = dados.get(campo, "").strip()
-        ws[celula] = valor if valor else "-"
+        ws[celula] = valores[campo]
+
+    wb.save(destino)
+
+def gerar_folha_dados(dados: dict):
+    _validar_obrigatorios(dados)
+    valores = valores_folha(dados)
 
     os.makedirs(OUTDIR, exist_ok=True)
-    nome_arquivo = f"{dados['Cliente Final']}.xlsx"
-    caminho_saida = os.path.join(OUTDIR, nome_arquivo)
+    caminho_saida = os.path.join(OUTDIR, nome_arquivo_saida(dados))
+
+    _gravar_folha(valores, caminho_saida)
 
-    wb.save(caminho_saida)
+def gerar_folha_bytes(dados: dict) -> bytes:
+    """Gera a folha em memória, sem gravar em OUTDIR."""
+    _validar_obrigatorios(dados)
+    buffer = io.BytesIO()
+    _gravar_folha(valores_folha(dados), buffer)
+    return buffer.getvalue()
 
 # ================= MÁSCARAS =================
 
@@ -110,6 +299,8 @@ def mascara_valor(entry):
 # ================= GUI MANUAL =================
 
 def gui_manual():
+    from tkinter import Tk, messagebox, ttk
+
     root = Tk()
     root.title("Gerar Folha de Rosto - Manual")
     root.geometry("600x800")
@@ -178,9 +369,565 @@ def gui_manual():
 
     root.mainloop()
 
+# ================= LEITURA DO LOTE =================
+
+def verificar_colunas(colunas):
+    colunas_faltantes = set(CAMPOS_CELULAS) - set(colunas)
+    if colunas_faltantes:
+        raise ValueError(
+            "A planilha está sem as seguintes colunas obrigatórias:\n\n"
+            + "\n".join(sorted(colunas_faltantes))
+        )
+
+def ler_lote(arquivo: str):
+    """
+    Abre a planilha de lote em modo somente leitura e valida o cabeçalho.
+
+    Retorna um gerador de (número da linha na planilha, dados), que lê as
+    linhas sob demanda: a memória não cresce com o tamanho do lote.
+    """
+    # A planilha fica aberta até o gerador terminar (ou ser descartado)
+    pilha = ExitStack()
+    abas = pilha.enter_context(abrir_planilha(arquivo))
+    try:
+        _, linhas = next(abas)
+        cabecalho = normalizar_cabecalhos(next(linhas, None) or ())
+
+        verificar_colunas(cabecalho)
+    except Exception:
+        pilha.close()
+        raise
+
+    # Posição de cada campo na linha, resolvida uma única vez
+    posicoes = [(campo, cabecalho.index(campo)) for campo in CAMPOS_CELULAS]
+
+    def gerar_linhas():
+        try:
+            for numero, valores in enumerate(linhas, start=2):
+                if all(v is None or str(v).strip() == "" for v in valores):
+                    continue
+                yield numero, {
+                    campo: str(valores[pos]).strip()
+                    if pos < len(valores) and valores[pos] is not None else ""
+                    for campo, pos in posicoes
+                }
+        finally:
+            pilha.close()
+
+    return gerar_linhas()
+
+# ================= VALIDAÇÃO DO LOTE =================
+
+CEP_RE = r"^\d{5}-?\d{3}$"
+FORMATOS_DATA = ["%d/%m/%Y", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d"]
+
+def validar_lote(df, primeiras: dict = None):
+    """
+    Valida um trecho do lote, coluna a coluna, antes de gerar qualquer arquivo.
+
+    df: DataFrame com as colunas de CAMPOS_CELULAS lidas como texto, no índice
+    original da planilha (linha na planilha = índice + 2).
+    primeiras: {nome em casefold: índice} das primeiras ocorrências de
+    "Cliente Final" nos trechos anteriores; atualizado com as deste trecho,
+    para que repetições entre trechos também sejam encontradas.
+    Retorna um DataFrame com as colunas Linha, Campo, Valor e Erro, vazio se o
+    trecho estiver correto.
+    """
+    import pandas as pd
+
+    textos = df[list(CAMPOS_CELULAS)].fillna("").astype(str).apply(lambda c: c.str.strip())
+    # Linhas totalmente vazias são ignoradas na geração
+    textos = textos[(textos != "").any(axis=1)]
+    vazios = (textos == "") | (textos == "-")
+
+    erros = []
+
+    def registrar(mascara, campo, mensagem):
+        if mascara.any():
+            erros.append(pd.DataFrame({
+                "Linha": textos.index[mascara] + 2,
+                "Campo": campo,
+                "Valor": textos.loc[mascara, campo].values,
+                "Erro": mensagem
+            }))
+
+    for campo in CAMPOS_OBRIGATORIOS:
+        registrar(textos[campo] == "", campo, "Campo obrigatório não preenchido.")
+
+    for campo in sorted(CAMPOS_DATA):
+        coluna = textos[campo]
+        valida = pd.Series(False, index=coluna.index)
+        for formato in FORMATOS_DATA:
+            valida |= pd.to_datetime(coluna, format=formato, errors="coerce").notna()
+        registrar(~vazios[campo] & ~valida, campo, "Data inválida (use DD/MM/AAAA).")
+
+    # CEP digitado como número perde o zero à esquerda no Excel
+    # (01310-100 → 1310100): com 7 dígitos, completa antes de conferir
+    cep = textos["CEP"].str.replace(r"^(\d{7})$", r"0\1", regex=True)
+    registrar(
+        ~vazios["CEP"] & ~cep.str.match(CEP_RE),
+        "CEP",
+        "CEP malformado (use 00000-000)."
+    )
+
+    for campo in sorted(CAMPOS_VALOR):
+        coluna = textos[campo].str.replace(r"^R\$\s*", "", regex=True)
+        # Formato brasileiro (1.234,56): remove milhar e troca a vírgula
+        brasileiro = coluna.str.contains(",", regex=False)
+        coluna = coluna.where(
+            ~brasileiro,
+            coluna.str.replace(".", "", regex=False).str.replace(",", ".", regex=False)
+        )
+        numerico = pd.to_numeric(coluna, errors="coerce").notna()
+        registrar(~vazios[campo] & ~numerico, campo, "Valor monetário inválido.")
+
+    # Mesma regra da geração: a primeira linha com o nome fica com o arquivo
+    if primeiras is None:
+        primeiras = {}
+    chave = textos["Cliente Final"].str.casefold()
+    chave = chave[textos["Cliente Final"] != ""]
+    if not chave.empty:
+        primeira = pd.Series(chave.index, index=chave.index).groupby(chave).transform("min")
+        # Nomes já vistos em trechos anteriores mantêm a primeira ocorrência de lá
+        primeira = chave.map(primeiras).fillna(primeira).astype(int)
+        primeiras.update(zip(chave, primeira))
+
+        repetido = primeira[primeira.index != primeira.values]
+        if not repetido.empty:
+            erros.append(pd.DataFrame({
+                "Linha": repetido.index + 2,
+                "Campo": "Cliente Final",
+                "Valor": textos.loc[repetido.index, "Cliente Final"].values,
+                "Erro": [
+                    f"'Cliente Final' repetido (primeira ocorrência na linha {p + 2})."
+                    for p in repetido
+                ]
+            }))
+
+    if not erros:
+        return pd.DataFrame(columns=["Linha", "Campo", "Valor", "Erro"])
+
+    return (
+        pd.concat(erros, ignore_index=True)
+        .sort_values(["Linha", "Campo"], kind="stable")
+        .reset_index(drop=True)
+    )
+
+def validar_arquivo_lote(arquivo: str, tamanho_bloco: int = None):
+    """
+    Valida a planilha de lote lendo-a pelo mesmo fluxo de ler_lote, em blocos
+    de tamanho_bloco linhas: a memória não cresce com o tamanho do lote.
+    """
+    import pandas as pd
+
+    tamanho_bloco = tamanho_bloco or TAMANHO_BLOCO_VALIDACAO
+    linhas = ler_lote(arquivo)
+    primeiras = {}
+    erros = []
+    while True:
+        bloco = list(islice(linhas, tamanho_bloco))
+        if not bloco:
+            break
+        numeros, dados = zip(*bloco)
+        df = pd.DataFrame.from_records(
+            list(dados), index=[n - 2 for n in numeros], columns=list(CAMPOS_CELULAS)
+        )
+        erros_bloco = validar_lote(df, primeiras)
+        if not erros_bloco.empty:
+            erros.append(erros_bloco)
+
+    if not erros:
+        return pd.DataFrame(columns=["Linha", "Campo", "Valor", "Erro"])
+    return pd.concat(erros, ignore_index=True)
+
+def resumo_erros_validacao(erros, max_erros: int = 15) -> str:
+    texto = f"{len(erros)} problema(s) encontrado(s). Nenhum arquivo foi gerado.\n\n"
+    texto += "\n".join(
+        f"Linha {e.Linha} – {e.Campo}: {e.Erro}"
+        for e in erros.head(max_erros).itertuples()
+    )
+    if len(erros) > max_erros:
+        texto += f"\n... e mais {len(erros) - max_erros} (ver console)"
+    return texto
+
+# ================= MANIFESTO DO LOTE =================
+
+# O manifesto (manifesto.py) fica em OUTDIR e guarda, para cada folha gerada
+# em lote, o hash dos valores da linha junto com o hash do modelo, além do
+# mtime/tamanho do arquivo gravado. Uma nova execução só regera as folhas
+# novas ou alteradas (ou cujo arquivo foi apagado/modificado fora do lote).
+
+def hash_modelo() -> str:
+    with open(MODELO_PATH, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def hash_linha(dados: dict, hash_do_modelo: str) -> str:
+    valores = valores_folha(dados)
+    conteudo = json.dumps([hash_do_modelo] + [valores[c] for c in CAMPOS_CELULAS], ensure_ascii=False)
+    return hashlib.sha256(conteudo.encode("utf-8")).hexdigest()
+
+def remover_orfaos(arquivos: list) -> int:
+    """Apaga folhas do manifesto cujas linhas não existem mais no lote."""
+    manifesto = carregar_manifesto(OUTDIR, MANIFESTO_NOME)
+    removidos = 0
+    for nome_arquivo in arquivos:
+        if nome_arquivo not in manifesto:
+            continue
+        try:
+            os.remove(os.path.join(OUTDIR, nome_arquivo))
+            removidos += 1
+        except FileNotFoundError:
+            pass
+        del manifesto[nome_arquivo]
+    salvar_manifesto(OUTDIR, MANIFESTO_NOME, manifesto)
+    return removidos
+
+# ================= LOTE PARALELO =================
+
+def _iniciar_trabalhador(modelo_path: str, outdir: str):
+    # Garante a mesma configuração do processo principal (inclusive no spawn)
+    global MODELO_PATH, OUTDIR
+    MODELO_PATH = modelo_path
+    OUTDIR = outdir
+
+def _gerar_bloco(bloco: list, em_memoria: bool = False) -> list:
+    # Retorna (linha, arquivo, conteúdo, erro); conteúdo só quando em_memoria
+    resultados = []
+    for linha, dados in bloco:
+        try:
+            if em_memoria:
+                conteudo = gerar_folha_bytes(dados)
+            else:
+                gerar_folha_dados(dados)
+                conteudo = None
+            resultados.append((linha, nome_arquivo_saida(dados), conteudo, None))
+        except Exception as e:
+            resultados.append((linha, None, None, str(e) or type(e).__name__))
+    return resultados
+
+def _executar_blocos(blocos, trabalhadores: int, em_memoria: bool = False):
+    """Processa os blocos e devolve os resultados de cada um, na ordem de envio."""
+    if trabalhadores <= 1:
+        for bloco in blocos:
+            yield _gerar_bloco(bloco, em_memoria)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(
+        max_workers=trabalhadores,
+        initializer=_iniciar_trabalhador,
+        initargs=(MODELO_PATH, OUTDIR)
+    ) as executor:
+        # Mantém no máximo 2 blocos por processo em andamento
+        pendentes = deque()
+        for bloco in blocos:
+            pendentes.append(executor.submit(_gerar_bloco, bloco, em_memoria))
+            if len(pendentes) >= trabalhadores * 2:
+                yield pendentes.popleft().result()
+        while pendentes:
+            yield pendentes.popleft().result()
+
+def _blocos_lote(linhas, tamanho_bloco: int, falhas: list, pular=None):
+    # Cada arquivo de saída pertence a uma única linha válida (a primeira que
+    # o declara), para que o resultado não dependa da ordem de execução.
+    # pular(linha, dados) decide se a linha dona do arquivo pode ser omitida.
+    gerados = {}
+    bloco = []
+    for linha, dados in linhas:
+        if all(dados.get(campo) for campo in CAMPOS_OBRIGATORIOS):
+            chave = nome_arquivo_saida(dados).casefold()
+            if chave in gerados:
+                falhas.append((
+                    linha,
+                    f"'Cliente Final' repetido; arquivo já gerado pela linha {gerados[chave]}."
+                ))
+                continue
+            gerados[chave] = linha
+
+            if pular is not None and pular(linha, dados):
+                continue
+
+        bloco.append((linha, dados))
+        if len(bloco) >= tamanho_bloco:
+            yield bloco
+            bloco = []
+    if bloco:
+        yield bloco
+
+def gerar_lote(
+    linhas,
+    trabalhadores: int = None,
+    tamanho_bloco: int = None,
+    incremental: bool = True
+) -> dict:
+    """
+    Gera as folhas de um lote sem interromper na primeira falha.
+
+    linhas: iterável de (número da linha na planilha, dados).
+    incremental: pula as linhas cuja folha já está atualizada segundo o
+    manifesto de OUTDIR. O manifesto é atualizado em qualquer caso.
+    Retorna {"sucesso": [(linha, arquivo)], "inalterados": [(linha, arquivo)],
+    "falhas": [(linha, motivo)], "orfaos": [arquivo]}, com as listas de
+    linhas ordenadas. "orfaos" são as folhas do manifesto sem linha no lote.
+    """
+    trabalhadores = trabalhadores or TRABALHADORES_LOTE
+    tamanho_bloco = tamanho_bloco or TAMANHO_BLOCO_LOTE
+
+    manifesto = carregar_manifesto(OUTDIR, MANIFESTO_NOME)
+    hash_do_modelo = hash_modelo()
+    hashes = {}
+
+    sucesso = []
+    inalterados = []
+    falhas = []
+
+    def pular(linha, dados):
+        nome_arquivo = nome_arquivo_saida(dados)
+        hashes[nome_arquivo] = hash_linha(dados, hash_do_modelo)
+        if incremental and arquivo_inalterado(OUTDIR, nome_arquivo, hashes[nome_arquivo], manifesto):
+            inalterados.append((linha, nome_arquivo))
+            return True
+        return False
+
+    blocos = _blocos_lote(linhas, tamanho_bloco, falhas, pular)
+
+    for resultados in _executar_blocos(blocos, trabalhadores):
+        for linha, arquivo, _, erro in resultados:
+            if erro is None:
+                sucesso.append((linha, arquivo))
+                manifesto[arquivo] = registro_manifesto(OUTDIR, arquivo, hashes[arquivo])
+            else:
+                falhas.append((linha, erro))
+
+    # Linhas que falharam voltam a ser geradas na próxima execução
+    for nome_arquivo in hashes:
+        if nome_arquivo in manifesto and manifesto[nome_arquivo]["hash"] != hashes[nome_arquivo]:
+            del manifesto[nome_arquivo]
+    salvar_manifesto(OUTDIR, MANIFESTO_NOME, manifesto)
+
+    orfaos = sorted(set(manifesto) - set(hashes))
+
+    sucesso.sort()
+    inalterados.sort()
+    falhas.sort()
+    return {"sucesso": sucesso, "inalterados": inalterados, "falhas": falhas, "orfaos": orfaos}
+
+# ================= SAÍDAS AGRUPADAS =================
+
+# Alternativas à pasta de arquivos individuais, ambas gravadas de uma só vez:
+# - "zip": todas as folhas (.xlsx) dentro de um único arquivo ZIP;
+# - "planilhas": uma única pasta de trabalho, com uma aba por "Cliente Final".
+MODOS_SAIDA = {
+    "pasta": "Arquivos individuais (outdir)",
+    "zip": "Arquivo ZIP único",
+    "planilhas": "Pasta de trabalho única (uma aba por cliente)"
+}
+
+def gerar_lote_zip(
+    linhas,
+    destino: str,
+    trabalhadores: int = None,
+    tamanho_bloco: int = None
+) -> dict:
+    """Gera as folhas em memória e grava todas em um único ZIP (destino)."""
+    trabalhadores = trabalhadores or TRABALHADORES_LOTE
+    tamanho_bloco = tamanho_bloco or TAMANHO_BLOCO_LOTE
+
+    sucesso = []
+    falhas = []
+
+    blocos = _blocos_lote(linhas, tamanho_bloco, falhas)
+
+    # Os .xlsx já são compactados: o ZIP apenas os armazena, na ordem do lote
+    with zipfile.ZipFile(destino, "w", zipfile.ZIP_STORED) as zf:
+        for resultados in _executar_blocos(blocos, trabalhadores, em_memoria=True):
+            for linha, arquivo, conteudo, erro in resultados:
+                if erro is None:
+                    zf.writestr(arquivo, conteudo)
+                    sucesso.append((linha, arquivo))
+                else:
+                    falhas.append((linha, erro))
+
+    falhas.sort()
+    return {"sucesso": sucesso, "inalterados": [], "falhas": falhas, "orfaos": []}
+
+_cache_estrutura = {"mtime": None, "estrutura": None}
+
+def _estrutura_modelo() -> dict:
+    # Conteúdo, estilos e dimensões do modelo, para replicá-lo em cada aba
+    mtime = os.stat(MODELO_PATH).st_mtime_ns
+    if _cache_estrutura["mtime"] == mtime:
+        return _cache_estrutura["estrutura"]
+
+    ws = obter_modelo().active
+    linhas = []
+    for row in ws.iter_rows():
+        linhas.append([
+            (
+                cell.value,
+                {
+                    "font": copy(cell.font),
+                    "fill": copy(cell.fill),
+                    "border": copy(cell.border),
+                    "alignment": copy(cell.alignment),
+                    "protection": copy(cell.protection),
+                    "number_format": cell.number_format
+                } if cell.has_style else None
+            )
+            for cell in row
+        ])
+
+    estrutura = {
+        "linhas": linhas,
+        "larguras": {
+            letra: dim.width for letra, dim in ws.column_dimensions.items() if dim.width
+        },
+        "alturas": {
+            numero: dim.height for numero, dim in ws.row_dimensions.items() if dim.height
+        },
+        "celulas": {celula: campo for campo, celula in CAMPOS_CELULAS.items()}
+    }
+    _cache_estrutura["mtime"] = mtime
+    _cache_estrutura["estrutura"] = estrutura
+    return estrutura
+
+def nome_aba(cliente: str, usados: set) -> str:
+    # Limites do Excel: até 31 caracteres, sem []:*?/\ e sem repetição
+    base = re.sub(r"[\[\]:*?/\\]", "_", cliente).strip("'") or "Folha"
+    nome = base[:31]
+    sufixo = 2
+    while nome.casefold() in usados:
+        marca = f" ({sufixo})"
+        nome = base[:31 - len(marca)] + marca
+        sufixo += 1
+    usados.add(nome.casefold())
+    return nome
+
+def gerar_lote_planilhas(linhas, destino: str) -> dict:
+    """Grava o lote em uma pasta de trabalho (write-only), uma aba por cliente."""
+    from openpyxl import Workbook
+    from openpyxl.cell.cell import WriteOnlyCell
+    from openpyxl.utils import get_column_letter
+
+    estrutura = _estrutura_modelo()
+
+    sucesso = []
+    falhas = []
+    usados = set()
+
+    wb = Workbook(write_only=True)
+
+    for bloco in _blocos_lote(linhas, TAMANHO_BLOCO_LOTE, falhas):
+        for linha, dados in bloco:
+            try:
+                _validar_obrigatorios(dados)
+                valores = valores_folha(dados)
+            except Exception as e:
+                falhas.append((linha, str(e) or type(e).__name__))
+                continue
+
+            ws = wb.create_sheet(nome_aba(dados["Cliente Final"], usados))
+            for letra, largura in estrutura["larguras"].items():
+                ws.column_dimensions[letra].width = largura
+            for numero, altura in estrutura["alturas"].items():
+                ws.row_dimensions[numero].height = altura
+
+            for numero, celulas in enumerate(estrutura["linhas"], start=1):
+                linha_aba = []
+                for coluna, (valor, estilo) in enumerate(celulas, start=1):
+                    campo = estrutura["celulas"].get(f"{get_column_letter(coluna)}{numero}")
+                    cell = WriteOnlyCell(ws, value=valores[campo] if campo else valor)
+                    if estilo:
+                        for atributo, conteudo in estilo.items():
+                            setattr(cell, atributo, conteudo)
+                    linha_aba.append(cell)
+                ws.append(linha_aba)
+
+            sucesso.append((linha, ws.title))
+
+    # Sem nenhuma aba válida não há pasta de trabalho a gravar
+    if sucesso:
+        wb.save(destino)
+
+    falhas.sort()
+    return {"sucesso": sucesso, "inalterados": [], "falhas": falhas, "orfaos": []}
+
+# ================= API DE LOTE =================
+
+class LoteInvalido(ValueError):
+    """Planilha de lote reprovada na validação; erros traz a tabela completa."""
+
+    def __init__(self, erros):
+        super().__init__(resumo_erros_validacao(erros))
+        self.erros = erros
+
+def processar_lote(
+    arquivo: str,
+    modo: str = "pasta",
+    destino: str = None,
+    trabalhadores: int = None,
+    validar: bool = True,
+    incremental: bool = True
+) -> dict:
+    """
+    Valida e gera um lote completo a partir do caminho da planilha.
+
+    modo: "pasta" (um arquivo por linha em OUTDIR), "zip" ou "planilhas";
+    os dois últimos exigem destino. Lança LoteInvalido se a validação
+    encontrar erros (nenhum arquivo é gravado) e ValueError se a planilha não
+    tiver dados. Retorna o mesmo dicionário de gerar_lote.
+    """
+    if modo not in MODOS_SAIDA:
+        raise ValueError(f"Modo de saída desconhecido: '{modo}'.")
+    if modo != "pasta" and not destino:
+        raise ValueError(f"O modo '{modo}' exige um arquivo de destino.")
+
+    # Validação completa antes de gravar qualquer arquivo
+    if validar:
+        erros = validar_arquivo_lote(arquivo)
+        if not erros.empty:
+            raise LoteInvalido(erros)
+
+    linhas = ler_lote(arquivo)
+    if modo == "zip":
+        resultado = gerar_lote_zip(linhas, destino, trabalhadores)
+    elif modo == "planilhas":
+        resultado = gerar_lote_planilhas(linhas, destino)
+    else:
+        resultado = gerar_lote(linhas, trabalhadores, incremental=incremental)
+
+    # Verificação de planilha vazia
+    if not resultado["sucesso"] and not resultado["inalterados"] and not resultado["falhas"]:
+        raise ValueError(
+            "A planilha selecionada não contém dados.\n\n"
+            "Preencha ao menos uma linha antes de continuar."
+        )
+
+    return resultado
+
+def resumo_lote(resultado: dict, max_falhas: int = 15) -> str:
+    sucesso = resultado["sucesso"]
+    falhas = resultado["falhas"]
+
+    texto = (
+        f"Total de folhas geradas: {len(sucesso)}\n"
+        f"Folhas inalteradas (não regeradas): {len(resultado.get('inalterados', []))}\n"
+        f"Linhas com falha: {len(falhas)}"
+    )
+    if falhas and max_falhas > 0:
+        texto += "\n\n" + "\n".join(
+            f"Linha {linha}: {motivo}" for linha, motivo in falhas[:max_falhas]
+        )
+        if len(falhas) > max_falhas:
+            texto += f"\n... e mais {len(falhas) - max_falhas} (ver console)"
+    return texto
+
 # ================= GUI LOTE =================
 
-def gui_lote():
+def gui_lote(modo: str = "pasta"):
+    from tkinter import messagebox, filedialog
+
     try:
         arquivo = filedialog.askopenfilename(
             title="Selecione a planilha de lote",
@@ -190,38 +937,50 @@ def gui_lote():
         if not arquivo:
             return
 
-        df = pd.read_excel(arquivo)
-
-        # Verificação de planilha vazia
-        if df.empty:
-            raise ValueError(
-                "A planilha selecionada não contém dados.\n\n"
-                "Preencha ao menos uma linha antes de continuar."
+        destino = None
+        if modo == "zip":
+            destino = filedialog.asksaveasfilename(
+                title="Salvar folhas de rosto como",
+                defaultextension=".zip",
+                filetypes=[("ZIP", "*.zip")]
+            )
+        elif modo == "planilhas":
+            destino = filedialog.asksaveasfilename(
+                title="Salvar folhas de rosto como",
+                defaultextension=".xlsx",
+                filetypes=[("Excel", "*.xlsx")]
             )
+        if modo != "pasta" and not destino:
+            return
+
+        resultado = processar_lote(arquivo, modo, destino)
 
-        # Validação de cabeçalho
-        colunas_esperadas = set(CAMPOS_CELULAS.keys())
-        colunas_encontradas = set(df.columns)
+        for linha, motivo in resultado["falhas"]:
+            print(f"⚠ Linha {linha}: {motivo}")
 
-        colunas_faltantes = colunas_esperadas - colunas_encontradas
-        if colunas_faltantes:
-            raise ValueError(
-                "A planilha está sem as seguintes colunas obrigatórias:\n\n"
-                + "\n".join(sorted(colunas_faltantes))
+        if resultado["falhas"]:
+            messagebox.showwarning(
+                "Concluído com falhas",
+                "Geração em lote concluída.\n\n" + resumo_lote(resultado)
+            )
+        else:
+            messagebox.showinfo(
+                "Sucesso",
+                "Geração em lote concluída.\n\n" + resumo_lote(resultado)
             )
 
-        for _, row in df.iterrows():
-            dados = {
-                campo: str(row[campo]).strip()
-                if not pd.isna(row[campo]) else ""
-                for campo in CAMPOS_CELULAS
-            }
-            gerar_folha_dados(dados)
+        orfaos = resultado["orfaos"]
+        if orfaos and messagebox.askyesno(
+            "Folhas sem linha no lote",
+            f"{len(orfaos)} folha(s) gerada(s) anteriormente não têm mais linha "
+            "correspondente na planilha.\n\nDeseja removê-las da pasta de saída?"
+        ):
+            removidos = remover_orfaos(orfaos)
+            messagebox.showinfo("Concluído", f"{removidos} folha(s) removida(s).")
 
-        messagebox.showinfo(
-            "Sucesso",
-            f"Geração em lote concluída.\n\nTotal de folhas geradas: {len(df)}"
-        )
+    except LoteInvalido as e:
+        print(e.erros.to_string(index=False))
+        messagebox.showerror("Planilha com erros", str(e))
 
     except Exception as e:
         messagebox.showerror("Erro", str(e))
@@ -230,9 +989,11 @@ def gui_lote():
 #=============INSTRUÇÕES============
 
 def mostrar_instrucoes_lote():
+    from tkinter import Tk, ttk
+
     janela = Tk()
     janela.title("Instruções – Geração em Lote")
-    janela.geometry("560x510")
+    janela.geometry("560x600")
     janela.resizable(True, True)
 
     style = ttk.Style(janela)
@@ -285,7 +1046,9 @@ def mostrar_instrucoes_lote():
         "• Não altere os nomes das colunas, no cabeçalho.\n"
         "• Os arquivos serão gerados no diretório outdir.\n"
         "• Campos opcionais podem permanecer em branco.\n"
-        "• O nome do arquivo será definido pelo campo 'Cliente Final'."
+        "• O nome do arquivo será definido pelo campo 'Cliente Final'.\n"
+        "• A planilha é validada antes da geração (datas, CEP, valores\n"
+        "  e 'Cliente Final' repetido); havendo erros, nada é gerado."
     )
 
     ttk.Label(
@@ -317,15 +1080,37 @@ def mostrar_instrucoes_lote():
         justify="left"
     ).pack(anchor="w", pady=(0, 20))
 
+    # ===== Seção: Formato de saída =====
+    ttk.Label(
+        container,
+        text="📦 Formato de Saída",
+        style="Section.TLabel"
+    ).pack(anchor="w", pady=(0, 6))
+
+    rotulos_modo = {rotulo: modo for modo, rotulo in MODOS_SAIDA.items()}
+    combo_modo = ttk.Combobox(
+        container,
+        values=list(rotulos_modo),
+        state="readonly",
+        width=48
+    )
+    combo_modo.set(MODOS_SAIDA["pasta"])
+    combo_modo.pack(anchor="w", pady=(0, 20))
+
     # ===== Botões =====
     botoes = ttk.Frame(container)
     botoes.pack(pady=10)
 
+    def continuar():
+        modo = rotulos_modo[combo_modo.get()]
+        janela.destroy()
+        gui_lote(modo)
+
     ttk.Button(
         botoes,
         text="Continuar para Selecionar a Planilha",
         style="Action.TButton",
-        command=lambda: [janela.destroy(), gui_lote()]
+        command=continuar
     ).pack(side="left", padx=10)
 
     ttk.Button(
@@ -340,6 +1125,8 @@ def mostrar_instrucoes_lote():
 
 #========== AJUDA ===========
 def mostrar_ajuda():
+    from tkinter import Tk, ttk
+
     janela = Tk()
     janela.title("Ajuda – Campos Obrigatórios")
     janela.geometry("420x360")
@@ -393,6 +1180,8 @@ def mostrar_ajuda():
 # ================= MENU INICIAL =================
 
 def menu_inicial():
+    from tkinter import Tk, ttk
+
     root = Tk()
     root.title("Gerador de Folhas de Rosto")
     root.geometry("420x320")
@@ -451,7 +1240,104 @@ def menu_inicial():
 
     root.mainloop()
 
+# ================= LINHA DE COMANDO =================
+
+def _dados_linha_comando(args) -> dict:
+    dados = {}
+    if args.json:
+        if args.json == "-":
+            dados.update(json.load(sys.stdin))
+        else:
+            with open(args.json, encoding="utf-8") as f:
+                dados.update(json.load(f))
+
+    for item in args.campo:
+        campo, separador, valor = item.partition("=")
+        if not separador:
+            raise ValueError(f"Use CAMPO=VALOR em --campo (recebido: '{item}').")
+        dados[campo.strip()] = valor
+
+    desconhecidos = set(dados) - set(CAMPOS_CELULAS)
+    if desconhecidos:
+        raise ValueError("Campos desconhecidos: " + ", ".join(sorted(desconhecidos)))
+
+    return {campo: "" if valor is None else str(valor) for campo, valor in dados.items()}
+
+def main(argv=None) -> int:
+    """
+    Sem argumentos abre o menu gráfico. Exemplos sem interface:
+      py gerar_folhaderosto.py manual --json dados.json
+      py gerar_folhaderosto.py manual --campo "Cliente Final=ACME" --campo UF=SP ...
+      py gerar_folhaderosto.py lote planilha_Lote.xlsx --saida zip --destino lote.zip
+    Retorna 0 em caso de sucesso, 1 se houver falhas e 2 se o lote for inválido.
+    """
+    global MODELO_PATH, OUTDIR
+
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        menu_inicial()
+        return 0
+
+    parser = argparse.ArgumentParser(
+        prog="gerar_folhaderosto",
+        description="Gera folhas de rosto a partir do modelo FR_Modelo.xlsx."
+    )
+    parser.add_argument("--modelo", default=MODELO_PATH, help="caminho do modelo .xlsx")
+    parser.add_argument("--outdir", default=OUTDIR, help="diretório de saída")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p_manual = sub.add_parser("manual", help="gera uma única folha")
+    p_manual.add_argument("--json", help="arquivo JSON com os campos ('-' para stdin)")
+    p_manual.add_argument(
+        "--campo", action="append", default=[], metavar="CAMPO=VALOR",
+        help="valor de um campo (pode ser repetido)"
+    )
+
+    p_lote = sub.add_parser("lote", help="gera as folhas de uma planilha de lote")
+    p_lote.add_argument("planilha", help="planilha de lote (.xlsx)")
+    p_lote.add_argument("--saida", choices=list(MODOS_SAIDA), default="pasta")
+    p_lote.add_argument("--destino", help="arquivo de saída dos modos zip/planilhas")
+    p_lote.add_argument("--trabalhadores", type=int, default=None)
+    p_lote.add_argument("--completo", action="store_true", help="ignora o manifesto e regera tudo")
+    p_lote.add_argument("--remover-orfaos", action="store_true", help="apaga folhas sem linha no lote")
+    p_lote.add_argument("--sem-validacao", action="store_true", help="não valida o lote antes de gerar")
+
+    args = parser.parse_args(argv)
+    MODELO_PATH = args.modelo
+    OUTDIR = args.outdir
+
+    try:
+        if args.comando == "manual":
+            dados = _dados_linha_comando(args)
+            gerar_folha_dados(dados)
+            print(os.path.join(OUTDIR, nome_arquivo_saida(dados)))
+            return 0
+
+        resultado = processar_lote(
+            args.planilha,
+            args.saida,
+            args.destino,
+            trabalhadores=args.trabalhadores,
+            validar=not args.sem_validacao,
+            incremental=not args.completo
+        )
+    except LoteInvalido as e:
+        print(e.erros.to_string(index=False), file=sys.stderr)
+        return 2
+    except (OSError, ValueError) as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        return 1
+
+    for linha, motivo in resultado["falhas"]:
+        print(f"⚠ Linha {linha}: {motivo}", file=sys.stderr)
+    print(resumo_lote(resultado, max_falhas=0))
+
+    if args.remover_orfaos and resultado["orfaos"]:
+        print(f"Folhas removidas: {remover_orfaos(resultado['orfaos'])}")
+
+    return 1 if resultado["falhas"] else 0
+
 # ================= START =================
 
 if __name__ == "__main__":
-    menu_inicial()
+    sys.exit(main())
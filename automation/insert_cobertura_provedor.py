@@ -2,17 +2,22 @@
 # SCRIPT PARA INCLUSÃO DE COBERTURAS GPON AUTOMATIZADA NO PORTAL SDWAN DA DFH
 #
 
+import sys
+import json
 import time
+import argparse
+import threading
+import unicodedata
+from datetime import datetime
+from contextlib import contextmanager
 import pandas as pd
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.alert import Alert
-from webdriver_manager.chrome import ChromeDriverManager
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 import os
+from planilhas import ler_excel
+
+# selenium/webdriver_manager são importados nas funções do navegador: o
+# motor HTTP (cobertura_http.py) não precisa deles.
 
 # ================================
 # SETUP
@@ -23,75 +28,306 @@ SD_USER = os.getenv("SD_USER")
 SD_PASS = os.getenv("SD_PASS")
 URL_ADD_COBERTURA = os.getenv("URL_ADD_COBERTURA")
 
+TECNOLOGIA = "GPON (Fibra) Banda Larga"
+
+EXCEL_ARQUIVO = "../data/Pasta1.xlsx"
+RELATORIO_ARQUIVO = "../outdir/relatorio_cobertura.xlsx"
+# Diário das execuções: o resultado de cada cidade, para retomar de onde parou
+DIARIO_ARQUIVO = "../outdir/diario_cobertura.jsonl"
+
+# Situação de cada cidade no relatório/diário. Só "Sucesso" conta como
+# incluída: as demais são processadas de novo na retomada.
+SUCESSO = "Sucesso"
+FALHOU = "Falhou"
+# Formulário reiniciado sem o alerta de sucesso: a inclusão não foi confirmada
+SEM_CONFIRMACAO = "Sem confirmação"
+
+# Sessões simultâneas do navegador (cada uma com seu próprio login)
+SESSOES = 1
+
+# Esperas do navegador (segundos): limite de cada condição e intervalo entre
+# verificações
+ESPERA_MAXIMA = 10
+INTERVALO_VERIFICACAO = 0.1
+
+# Etapas cronometradas por cidade (colunas "Tempo - <etapa> (s)" no relatório)
+ETAPAS = ("navegar", "preencher", "localizar", "incluir", "alerta")
+PREFIXO_TEMPO = "Tempo - "
+
 # ================================
 # CARREGAR EXCEL (opcional)
 # ================================
-EXCEL_ARQUIVO = "../data/Pasta1.xlsx"
-df = pd.read_excel(EXCEL_ARQUIVO, header=None)  # Sem cabeçalho
-print("Total de linhas carregadas:", len(df))
+def carregar_cidades(arquivo=EXCEL_ARQUIVO):
+    df = ler_excel(arquivo, header=None)  # Sem cabeçalho
+    print("Total de linhas carregadas:", len(df))
+    return [(str(row[0]).strip(), str(row[1]).strip()) for _, row in df.iterrows()]
+
+def chave_cidade(cidade, estado):
+    """Cidade/UF comparáveis: sem acentos, sem diferença de maiúsculas e espaços."""
+    def normalizar(texto):
+        texto = unicodedata.normalize("NFKD", str(texto))
+        texto = "".join(c for c in texto if not unicodedata.combining(c))
+        return " ".join(texto.split()).casefold()
+    return f"{normalizar(cidade)}|{normalizar(estado)}"
+
+def deduplicar(cidades):
+    """Remove cidade/UF repetidas (mantém a primeira grafia); retorna (lista, repetidas)."""
+    vistas = set()
+    unicas = []
+    for cidade, estado in cidades:
+        chave = chave_cidade(cidade, estado)
+        if chave in vistas:
+            continue
+        vistas.add(chave)
+        unicas.append((cidade, estado))
+    return unicas, len(cidades) - len(unicas)
+
+# ================================
+# TRABALHOS (VÁRIOS PROVEDORES)
+# ================================
+class Trabalho:
+    """Lista de cidades a incluir numa URL de cobertura, com uma tecnologia."""
+
+    def __init__(self, nome, cidades, url=None, tecnologia=None):
+        self.nome = nome
+        self.cidades = cidades
+        self.url = url or URL_ADD_COBERTURA
+        self.tecnologia = tecnologia or TECNOLOGIA
+
+    @property
+    def destino(self):
+        return destino_cobertura(self.url, self.tecnologia)
+
+def destino_cobertura(url=None, tecnologia=None):
+    """Identifica onde a cobertura é incluída (URL + tecnologia) no diário."""
+    return f"{url or URL_ADD_COBERTURA}|{tecnologia or TECNOLOGIA}"
+
+def carregar_trabalhos(arquivo):
+    """
+    Lê o arquivo de trabalhos (JSON): uma lista de objetos com "planilha"
+    (Cidade/Estado, como Pasta1.xlsx) ou "cidades" ([["Cidade", "UF"], ...])
+    e, opcionais, "nome", "url" (padrão: URL_ADD_COBERTURA) e "tecnologia"
+    (padrão: TECNOLOGIA). Planilhas relativas partem da pasta do arquivo.
+    """
+    with open(arquivo, encoding="utf-8") as f:
+        entradas = json.load(f)
+    if isinstance(entradas, dict):
+        entradas = entradas.get("trabalhos", [])
+
+    pasta = os.path.dirname(os.path.abspath(arquivo))
+    trabalhos = []
+    nomes = set()
+    for numero, entrada in enumerate(entradas, start=1):
+        if "cidades" in entrada:
+            cidades = [(str(cidade).strip(), str(estado).strip()) for cidade, estado in entrada["cidades"]]
+            padrao = f"Trabalho {numero}"
+        elif "planilha" in entrada:
+            cidades = carregar_cidades(os.path.join(pasta, entrada["planilha"]))
+            padrao = os.path.splitext(os.path.basename(entrada["planilha"]))[0]
+        else:
+            raise ValueError(f"Trabalho {numero}: informe \"planilha\" ou \"cidades\".")
+        nome = str(entrada.get("nome") or padrao)
+        if nome in nomes:
+            nome = f"{nome} ({numero})"
+        nomes.add(nome)
+        trabalhos.append(Trabalho(nome, cidades, entrada.get("url"), entrada.get("tecnologia")))
+    return trabalhos
+
+# ================================
+# DIÁRIO (RETOMADA)
+# ================================
+class Diario:
+    """
+    Arquivo JSON Lines com uma linha por cidade processada, gravada assim que
+    o resultado sai (sobrevive a quedas no meio da execução). Vale o último
+    resultado de cada cidade/UF para o mesmo destino (URL + tecnologia).
+    """
+
+    def __init__(self, caminho=DIARIO_ARQUIVO):
+        self.caminho = caminho
+        self._trava = threading.Lock()
+        self.resultados = {}
+        try:
+            with open(caminho, encoding="utf-8") as f:
+                for linha in f:
+                    try:
+                        registro = json.loads(linha)
+                    except ValueError:
+                        # Linha cortada por uma queda durante a gravação
+                        continue
+                    if "destino" in registro and "chave" in registro:
+                        self.resultados[(registro["destino"], registro["chave"])] = registro
+        except FileNotFoundError:
+            pass
+
+    def resultado(self, cidade, estado, destino=None):
+        return self.resultados.get((destino or destino_cobertura(), chave_cidade(cidade, estado)))
+
+    def concluida(self, cidade, estado, destino=None):
+        registro = self.resultado(cidade, estado, destino)
+        return registro is not None and registro.get("status") == SUCESSO
+
+    def registrar(self, cidade, estado, status, mensagem, destino=None):
+        registro = {
+            "destino": destino or destino_cobertura(),
+            "chave": chave_cidade(cidade, estado),
+            "cidade": cidade,
+            "estado": estado,
+            "status": status,
+            "mensagem": str(mensagem) if mensagem is not None else "",
+            "data": datetime.now().isoformat(timespec="seconds"),
+        }
+        with self._trava:
+            pasta = os.path.dirname(self.caminho)
+            if pasta:
+                os.makedirs(pasta, exist_ok=True)
+            with open(self.caminho, "a", encoding="utf-8") as f:
+                f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+            self.resultados[(registro["destino"], registro["chave"])] = registro
 
 # ================================
 # INICIAR WEBDRIVER
 # ================================
-options = webdriver.ChromeOptions()
-options.add_argument("--start-maximized")
+def iniciar_driver(caminho_driver, headless=False):
+    from selenium import webdriver
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.chrome.service import Service
+
+    options = webdriver.ChromeOptions()
+    options.add_argument("--start-maximized")
+    if headless:
+        options.add_argument("--headless=new")
 
-driver = webdriver.Chrome(
-    service=Service(ChromeDriverManager().install()),
-    options=options
-)
-wait = WebDriverWait(driver, 10)
+    driver = webdriver.Chrome(
+        service=Service(caminho_driver),
+        options=options
+    )
+    wait = WebDriverWait(driver, ESPERA_MAXIMA, poll_frequency=INTERVALO_VERIFICACAO)
+    return driver, wait
 
 # ================================
 # LOGIN NO SDWAN
 # ================================
-driver.get(URL_SDWAN)
+def login(driver, wait):
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
 
-# Preencher usuário
-campo_user = wait.until(EC.presence_of_element_located((By.ID, "set_Login")))
-campo_user.clear()
-campo_user.send_keys(SD_USER)
+    driver.get(URL_SDWAN)
 
-# Preencher senha
-campo_pass = wait.until(EC.presence_of_element_located((By.ID, "set_pass")))
-campo_pass.clear()
-campo_pass.send_keys(SD_PASS)
-time.sleep(1)
+    # Preencher usuário
+    campo_user = wait.until(EC.presence_of_element_located((By.ID, "set_Login")))
+    campo_user.clear()
+    campo_user.send_keys(SD_USER)
 
-# Clicar no botão Login usando XPath filtrando pelo texto
-bot_login = wait.until(
-    EC.element_to_be_clickable(
-        (By.XPATH, "//button[normalize-space(text())='Login']")
+    # Preencher senha
+    campo_pass = wait.until(EC.presence_of_element_located((By.ID, "set_pass")))
+    campo_pass.clear()
+    campo_pass.send_keys(SD_PASS)
+    wait.until(lambda d: campo_pass.get_attribute("value") == SD_PASS)
+
+    # Clicar no botão Login usando XPath filtrando pelo texto
+    bot_login = wait.until(
+        EC.element_to_be_clickable(
+            (By.XPATH, "//button[normalize-space(text())='Login']")
+        )
     )
-)
-driver.execute_script("arguments[0].click();", bot_login)
+    driver.execute_script("arguments[0].click();", bot_login)
+
+    # Esperar redirecionamento para portal
+    wait.until(EC.url_contains("portal.html"))
+
+# ================================
+# CRONÔMETRO DAS ETAPAS
+# ================================
+class Cronometro:
+    """Soma o tempo (segundos) de cada etapa de uma cidade, mesmo se ela falhar."""
 
+    def __init__(self):
+        self.tempos = {}
 
-# Esperar redirecionamento para portal
-wait.until(EC.url_contains("portal.html"))
-print("Login concluído. Redirecionamento detectado.")
+    @contextmanager
+    def etapa(self, nome):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.tempos[nome] = self.tempos.get(nome, 0.0) + time.perf_counter() - inicio
 
 # ================================
-# LOOP PRINCIPAL
+# INCLUSÃO DE UMA COBERTURA
 # ================================
-for index, row in df.iterrows():
-    cidade = str(row[0]).strip()
-    estado = str(row[1]).strip()
-    valor_concat = f"{cidade} - {estado}"
+class SemRespostaPortal(Exception):
+    """Nem alerta nem formulário reiniciado depois de "Incluir Cobertura"."""
 
-    print(f"\n>>> Processando: {valor_concat}")
+class InclusaoNaoConfirmada(Exception):
+    """O portal respondeu a "Incluir Cobertura", mas sem o texto do alerta de sucesso."""
 
-    try:
-        # ----------------------------
-        # Navegar para página de cobertura
-        # ----------------------------
-        driver.get(URL_ADD_COBERTURA)
-        time.sleep(1)  # garantir carregamento
+def pagina_carregada(driver):
+    return driver.execute_script("return document.readyState") == "complete"
+
+def resposta_inclusao(campo_cidade):
+    """
+    Condição de espera após "Incluir Cobertura": ("alerta", alerta) quando o
+    portal mostra o alerta, ("fechado", texto) quando o navegador fechou o
+    alerta antes da leitura, ou ("formulario", None) quando o formulário é
+    reiniciado sem alerta (cb_Cidade vazio ou página recarregada).
+    """
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.common.exceptions import StaleElementReferenceException, UnexpectedAlertPresentException
+
+    def condicao(driver):
+        alerta = EC.alert_is_present()(driver)
+        if alerta:
+            return "alerta", alerta
+        try:
+            if not campo_cidade.get_attribute("value").strip():
+                return "formulario", None
+        except StaleElementReferenceException:
+            return "formulario", None
+        except UnexpectedAlertPresentException as e:
+            # O alerta surgiu entre as duas verificações; o Chrome pode já
+            # tê-lo fechado, e então só resta o texto trazido pela exceção
+            alerta = EC.alert_is_present()(driver)
+            if alerta:
+                return "alerta", alerta
+            return "fechado", e.alert_text
+        return False
+
+    return condicao
+
+def incluir_cobertura(driver, wait, valor_concat, cronometro=None, url=None, tecnologia=None):
+    """
+    Inclui a cobertura na página `url` (padrão: URL_ADD_COBERTURA) com a
+    `tecnologia` (padrão: TECNOLOGIA); retorna o texto do alerta de sucesso.
+    Levanta InclusaoNaoConfirmada se o formulário foi reiniciado sem alerta
+    (ou o alerta foi fechado sem texto) e SemRespostaPortal se não houve
+    resposta em ESPERA_MAXIMA.
+    """
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.common.exceptions import TimeoutException, UnexpectedAlertPresentException
+
+    cronometro = cronometro or Cronometro()
+
+    # Um alerta atrasado da cidade anterior bloquearia a navegação
+    alerta = EC.alert_is_present()(driver)
+    if alerta:
+        alerta.accept()
 
+    # ----------------------------
+    # Navegar para página de cobertura
+    # ----------------------------
+    with cronometro.etapa("navegar"):
+        driver.get(url or URL_ADD_COBERTURA)
+        # Página pronta e formulário editável (no lugar de uma pausa fixa)
+        wait.until(pagina_carregada)
+        campo_nome = wait.until(EC.element_to_be_clickable((By.ID, "cb_nome")))
+
+    with cronometro.etapa("preencher"):
         # ----------------------------
         # 1) Preencher cb_nome
         # ----------------------------
-        campo_nome = wait.until(EC.presence_of_element_located((By.ID, "cb_nome")))
         campo_nome.clear()
         campo_nome.send_keys(valor_concat)
 
@@ -99,7 +335,7 @@ for index, row in df.iterrows():
         # 2) Alterar tecnologia
         # ----------------------------
         campo_tec = driver.find_element(By.ID, "cb_Tecnologia")
-        driver.execute_script("arguments[0].value = 'GPON (Fibra) Banda Larga';", campo_tec)
+        driver.execute_script("arguments[0].value = arguments[1];", campo_tec, tecnologia or TECNOLOGIA)
 
         # ----------------------------
         # 3) Alterar address
@@ -108,34 +344,343 @@ for index, row in df.iterrows():
         campo_addr.clear()
         campo_addr.send_keys(valor_concat)
 
-        # ----------------------------
-        # 4) Localizar ponto
-        # ----------------------------
+    # ----------------------------
+    # 4) Localizar ponto
+    # ----------------------------
+    with cronometro.etapa("localizar"):
         bot_localizar = driver.find_element(By.XPATH, "//input[@value='Localizar Ponto']")
         bot_localizar.click()
-        wait.until(lambda d: d.find_element(By.ID, "cb_Cidade").get_attribute("value").strip() != "")
+        campo_cidade = driver.find_element(By.ID, "cb_Cidade")
+        wait.until(lambda d: campo_cidade.get_attribute("value").strip() != "")
 
-        # ----------------------------
-        # 5) Incluir cobertura
-        # ----------------------------
-        bot_incluir = driver.find_element(By.XPATH, "//input[@value='Incluir Cobertura']")
+    # ----------------------------
+    # 5) Incluir cobertura
+    # ----------------------------
+    with cronometro.etapa("incluir"):
+        bot_incluir = wait.until(
+            EC.element_to_be_clickable((By.XPATH, "//input[@value='Incluir Cobertura']"))
+        )
         bot_incluir.click()
 
-        # ----------------------------
-        # 6) Aguardar alerta de sucesso
-        # ----------------------------
+    # ----------------------------
+    # 6) Aguardar a resposta: alerta de sucesso ou formulário reiniciado
+    # ----------------------------
+    with cronometro.etapa("alerta"):
+        espera = WebDriverWait(
+            driver, ESPERA_MAXIMA, poll_frequency=INTERVALO_VERIFICACAO,
+            ignored_exceptions=[UnexpectedAlertPresentException]
+        )
         try:
-            alerta = wait.until(EC.alert_is_present())
-            print("Alerta recebido:", alerta.text)
-            alerta.accept()
-        except:
-            print("⚠ Nenhum alerta encontrado — verificar comportamento do site")
+            resposta, alerta = espera.until(resposta_inclusao(campo_cidade))
+        except TimeoutException:
+            raise SemRespostaPortal(
+                f"Sem alerta nem formulário reiniciado em {ESPERA_MAXIMA} s após Incluir Cobertura"
+            ) from None
+        if resposta == "formulario":
+            raise InclusaoNaoConfirmada("Formulário reiniciado sem alerta — verificar no portal")
+        if resposta == "fechado":
+            if not alerta:
+                raise InclusaoNaoConfirmada("Alerta fechado pelo navegador sem texto — verificar no portal")
+            return alerta
+        texto = alerta.text
+        alerta.accept()
+        return texto
+
+# ================================
+# PROGRESSO COMPARTILHADO
+# ================================
+class Progresso:
+    """
+    Contador único para todas as sessões; imprime uma linha por cidade (com
+    o andamento do trabalho, se houver mais de um) e, com um diário, grava o
+    resultado dela.
+    """
+
+    def __init__(self, total, diario=None, trabalhos=None):
+        self.total = total
+        self.diario = diario
+        # {nome do trabalho: [concluídos, total]}
+        self.por_trabalho = (
+            {t.nome: [0, len(t.cidades)] for t in trabalhos} if trabalhos and len(trabalhos) > 1 else {}
+        )
+        self.concluidos = 0
+        self.falhas = 0
+        self.inicio = time.monotonic()
+        self._trava = threading.Lock()
 
-        print(f"✔ {valor_concat}: Sucesso")
+    def registrar(self, sessao, cidade, estado, status, mensagem, trabalho=None):
+        if self.diario is not None:
+            self.diario.registrar(cidade, estado, status, mensagem, trabalho.destino if trabalho else None)
+        valor_concat = f"{cidade} - {estado}"
+        with self._trava:
+            self.concluidos += 1
+            if status != SUCESSO:
+                self.falhas += 1
+            decorrido = time.monotonic() - self.inicio
+            restante = decorrido / self.concluidos * (self.total - self.concluidos)
+            prefixo = f"[{sessao}] [{self.concluidos}/{self.total}, falhas: {self.falhas}, restam ~{restante / 60:.0f} min]"
+            if trabalho is not None and trabalho.nome in self.por_trabalho:
+                contagem = self.por_trabalho[trabalho.nome]
+                contagem[0] += 1
+                prefixo += f" [{trabalho.nome}: {contagem[0]}/{contagem[1]}]"
+            if status == SUCESSO:
+                print(f"{prefixo} ✔ {valor_concat}: {status}" + (f" — {mensagem}" if mensagem else ""))
+            else:
+                print(f"{prefixo} ⚠ {valor_concat}: {status} — {mensagem}")
 
+# ================================
+# SESSÃO (uma por fatia da fila)
+# ================================
+def executar_sessao(sessao, itens, caminho_driver, progresso, headless=False):
+    """
+    Abre um navegador, faz login e processa os itens desta fatia da fila:
+    [(posição, trabalho, cidade, estado)], de um ou mais trabalhos. Retorna
+    uma linha do relatório por cidade: (posição, cidade, estado, sessão,
+    status, mensagem, tempos das etapas).
+    """
+    resultados = []
+    rotulo = f"S{sessao}"
+    driver = None
+    try:
+        driver, wait = iniciar_driver(caminho_driver, headless)
+        login(driver, wait)
+        print(f"[{rotulo}] Login concluído. Redirecionamento detectado.")
     except Exception as e:
-        print(f"⚠ {valor_concat}: Falhou — {e}")
-        continue  # continuar para próxima linha
+        # Sem login, todas as cidades da fatia falham
+        for posicao, trabalho, cidade, estado in itens:
+            resultados.append((posicao, cidade, estado, sessao, FALHOU, f"Login: {e}", {}))
+            progresso.registrar(rotulo, cidade, estado, FALHOU, f"Login: {e}", trabalho)
+        if driver is not None:
+            driver.quit()
+        return resultados
+
+    try:
+        # O mesmo login serve a todos os trabalhos: só muda a página e a tecnologia
+        for posicao, trabalho, cidade, estado in itens:
+            valor_concat = f"{cidade} - {estado}"
+            cronometro = Cronometro()
+            try:
+                try:
+                    status, mensagem = SUCESSO, incluir_cobertura(
+                        driver, wait, valor_concat, cronometro, trabalho.url, trabalho.tecnologia
+                    )
+                except InclusaoNaoConfirmada as e:
+                    status, mensagem = SEM_CONFIRMACAO, str(e)
+                resultados.append((posicao, cidade, estado, sessao, status, mensagem, cronometro.tempos))
+                progresso.registrar(rotulo, cidade, estado, status, mensagem, trabalho)
+            except Exception as e:
+                # continuar para próxima linha
+                resultados.append((posicao, cidade, estado, sessao, FALHOU, str(e), cronometro.tempos))
+                progresso.registrar(rotulo, cidade, estado, FALHOU, e, trabalho)
+    finally:
+        driver.quit()
+    return resultados
+
+# ================================
+# EXECUÇÃO EM PARALELO
+# ================================
+def fila_de_trabalhos(trabalhos):
+    """Todos os trabalhos numa única fila: [((nº do trabalho, posição), trabalho, cidade, estado)]."""
+    return [
+        ((numero, posicao), trabalho, cidade, estado)
+        for numero, trabalho in enumerate(trabalhos)
+        for posicao, (cidade, estado) in enumerate(trabalho.cidades)
+    ]
+
+def fatiar(itens, sessoes):
+    # Distribuição intercalada: cada sessão recebe itens de toda a fila
+    return [fatia for fatia in (itens[i::sessoes] for i in range(sessoes)) if fatia]
+
+def relatorios_por_trabalho(trabalhos, resultados, etapas=ETAPAS):
+    """Separa as linhas da fila num relatório por trabalho (na ordem de cada lista)."""
+    linhas = [[] for _ in trabalhos]
+    for linha in resultados:
+        numero, posicao = linha[0]
+        linhas[numero].append((posicao,) + tuple(linha[1:]))
+    return [montar_relatorio(linhas_trabalho, etapas) for linhas_trabalho in linhas]
+
+def incluir_trabalhos(trabalhos, sessoes=None, headless=False, diario=None):
+    """
+    Processa as cidades de todos os trabalhos como uma única fila, em até
+    `sessoes` navegadores simultâneos (um login por navegador, reaproveitado
+    entre trabalhos), gravando cada resultado no diário (se houver).
+    Retorna um relatório (DataFrame) por trabalho, na ordem de `trabalhos`.
+    """
+    from webdriver_manager.chrome import ChromeDriverManager
+
+    itens = fila_de_trabalhos(trabalhos)
+    if not itens:
+        return [montar_relatorio([]) for _ in trabalhos]
+    sessoes = max(1, min(sessoes or SESSOES, len(itens)))
+    # Um único download/verificação do chromedriver para todas as sessões
+    caminho_driver = ChromeDriverManager().install()
+    progresso = Progresso(len(itens), diario, trabalhos)
+
+    fatias = fatiar(itens, sessoes)
+    with ThreadPoolExecutor(max_workers=len(fatias)) as executor:
+        futuros = [
+            executor.submit(executar_sessao, numero, fatia, caminho_driver, progresso, headless)
+            for numero, fatia in enumerate(fatias, start=1)
+        ]
+        resultados = [linha for futuro in futuros for linha in futuro.result()]
+
+    return relatorios_por_trabalho(trabalhos, resultados)
+
+def incluir_coberturas(cidades, sessoes=None, headless=False, diario=None, url=None, tecnologia=None):
+    """
+    Processa a lista [(cidade, estado)] (um único trabalho) em até `sessoes`
+    navegadores simultâneos. Retorna o relatório (DataFrame) na ordem da
+    planilha.
+    """
+    return incluir_trabalhos([Trabalho("", cidades, url, tecnologia)], sessoes, headless, diario)[0]
+
+def montar_relatorio(resultados, etapas=ETAPAS):
+    """
+    Relatório na ordem da planilha a partir das linhas de todas as sessões,
+    com uma coluna de tempo (segundos) por etapa.
+    """
+    linhas = sorted(resultados, key=lambda linha: linha[0])
+    relatorio = pd.DataFrame(
+        [linha[1:6] for linha in linhas],
+        columns=["Cidade", "Estado", "Sessão", "Status", "Mensagem"]
+    )
+    for etapa in etapas:
+        relatorio[f"{PREFIXO_TEMPO}{etapa} (s)"] = pd.Series(
+            [linha[6].get(etapa) if len(linha) > 6 else None for linha in linhas], dtype="float64"
+        ).round(3)
+    return relatorio
+
+def resumo_tempos(relatorio):
+    """p50/p95/máximo e total (segundos) de cada etapa das cidades processadas."""
+    colunas = [c for c in relatorio.columns if c.startswith(PREFIXO_TEMPO)]
+    linhas = []
+    for coluna in colunas:
+        tempos = relatorio[coluna].dropna()
+        if tempos.empty:
+            continue
+        linhas.append({
+            "Etapa": coluna[len(PREFIXO_TEMPO):-len(" (s)")],
+            "p50": tempos.quantile(0.50),
+            "p95": tempos.quantile(0.95),
+            "máx": tempos.max(),
+            "total": tempos.sum(),
+        })
+    return pd.DataFrame(linhas, columns=["Etapa", "p50", "p95", "máx", "total"])
+
+def relatorio_com_diario(cidades, relatorio, diario, destino=None):
+    """
+    Relatório de todas as cidades da planilha: as processadas agora (linhas
+    de relatorio) e as puladas por já constarem no diário como incluídas.
+    """
+    processadas = {
+        chave_cidade(linha[0], linha[1]): tuple(linha)
+        for linha in relatorio.itertuples(index=False)
+    }
+    linhas = []
+    for cidade, estado in cidades:
+        chave = chave_cidade(cidade, estado)
+        if chave in processadas:
+            linhas.append(processadas[chave])
+        else:
+            data = diario.resultado(cidade, estado, destino).get("data", "")
+            linhas.append(
+                (cidade, estado, "Diário", SUCESSO, f"Já incluída em execução anterior ({data})")
+                + (None,) * (len(relatorio.columns) - 5)
+            )
+    return pd.DataFrame(linhas, columns=relatorio.columns)
+
+def salvar_relatorio(relatorio, arquivo=RELATORIO_ARQUIVO):
+    pasta = os.path.dirname(arquivo)
+    if pasta:
+        os.makedirs(pasta, exist_ok=True)
+    relatorio.to_excel(arquivo, index=False)
+
+# ================================
+# LOOP PRINCIPAL
+# ================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="insert_cobertura_provedor",
+        description="Inclui coberturas no portal SDWAN para as cidades da planilha (ou de vários trabalhos)."
+    )
+    parser.add_argument("--planilha", default=EXCEL_ARQUIVO, help=f"Cidade (A) e Estado (B), sem cabeçalho (padrão: {EXCEL_ARQUIVO})")
+    parser.add_argument("--url", default=None, help="página de inclusão de cobertura (padrão: URL_ADD_COBERTURA do .env)")
+    parser.add_argument("--tecnologia", default=None, help=f"tecnologia das coberturas (padrão: {TECNOLOGIA})")
+    parser.add_argument(
+        "--trabalhos", default=None,
+        help="arquivo JSON com vários trabalhos (planilha ou cidades, url, tecnologia), processados numa única fila; substitui --planilha"
+    )
+    parser.add_argument("--sessoes", type=int, default=SESSOES, help="navegadores simultâneos, cada um com seu login")
+    parser.add_argument("--relatorio", default=RELATORIO_ARQUIVO, help=f"relatório consolidado (padrão: {RELATORIO_ARQUIVO})")
+    parser.add_argument("--headless", action="store_true", help="navegadores sem janela")
+    parser.add_argument(
+        "--motor", choices=["navegador", "http"], default="navegador",
+        help="http: envia os formulários direto ao portal, sem Chrome (ver cobertura_http.py)"
+    )
+    parser.add_argument("--concorrencia", type=int, default=None, help="motor http: requisições simultâneas")
+    parser.add_argument("--taxa", type=float, default=None, help="motor http: máximo de requisições por segundo")
+    parser.add_argument("--diario", default=DIARIO_ARQUIVO, help=f"diário para retomar execuções (padrão: {DIARIO_ARQUIVO})")
+    parser.add_argument("--refazer", action="store_true", help="processa de novo as cidades já incluídas segundo o diário")
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+
+    if args.trabalhos:
+        trabalhos = carregar_trabalhos(args.trabalhos)
+    else:
+        nome = os.path.splitext(os.path.basename(args.planilha))[0]
+        trabalhos = [Trabalho(nome, carregar_cidades(args.planilha), args.url, args.tecnologia)]
+    varios = len(trabalhos) > 1
+
+    diario = Diario(args.diario)
+    pendentes = []
+    for trabalho in trabalhos:
+        rotulo = f"{trabalho.nome}: " if varios else ""
+        trabalho.cidades, repetidas = deduplicar(trabalho.cidades)
+        if repetidas:
+            print(f"{rotulo}{repetidas} linha(s) repetida(s) de cidade/UF ignorada(s).")
+        restantes = trabalho.cidades if args.refazer else [
+            (cidade, estado) for cidade, estado in trabalho.cidades
+            if not diario.concluida(cidade, estado, trabalho.destino)
+        ]
+        if len(restantes) < len(trabalho.cidades):
+            print(f"{rotulo}{len(trabalho.cidades) - len(restantes)} cidade(s) já incluída(s) segundo o diário; restam {len(restantes)}.")
+        pendentes.append(Trabalho(trabalho.nome, restantes, trabalho.url, trabalho.tecnologia))
+    if not any(trabalho.cidades for trabalho in trabalhos):
+        print("Nenhuma cidade na planilha.")
+        return 0
+
+    if not any(trabalho.cidades for trabalho in pendentes):
+        relatorios = [montar_relatorio([]) for _ in trabalhos]
+    elif args.motor == "http":
+        from cobertura_http import FalhaPortal, incluir_trabalhos_http
+        try:
+            relatorios = incluir_trabalhos_http(pendentes, args.concorrencia, args.taxa, diario)
+        except (FalhaPortal, OSError) as e:
+            print(f"Erro: {e}", file=sys.stderr)
+            return 2
+    else:
+        relatorios = incluir_trabalhos(pendentes, args.sessoes, args.headless, diario)
+
+    for numero, (trabalho, pendente) in enumerate(zip(trabalhos, pendentes)):
+        if len(pendente.cidades) < len(trabalho.cidades):
+            relatorios[numero] = relatorio_com_diario(trabalho.cidades, relatorios[numero], diario, trabalho.destino)
+        if varios:
+            relatorios[numero].insert(0, "Trabalho", trabalho.nome)
+    relatorio = pd.concat(relatorios, ignore_index=True) if varios else relatorios[0]
+    salvar_relatorio(relatorio, args.relatorio)
+
+    falhas = int((relatorio["Status"] != SUCESSO).sum())
+    print("\n=== Finalizado! ===")
+    if varios:
+        for trabalho, relatorio_trabalho in zip(trabalhos, relatorios):
+            falhas_trabalho = int((relatorio_trabalho["Status"] != SUCESSO).sum())
+            print(f"{trabalho.nome} ({trabalho.tecnologia}): {len(relatorio_trabalho) - falhas_trabalho} incluídas, {falhas_trabalho} com falha ou sem confirmação.")
+    print(f"{len(relatorio) - falhas} incluídas, {falhas} com falha ou sem confirmação. Relatório: {args.relatorio}")
+    tempos = resumo_tempos(relatorio)
+    if not tempos.empty:
+        print("\nTempo por etapa (s):")
+        print(tempos.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+    return 1 if falhas else 0
+
 
-print("\n=== Finalizado! ===")
-driver.quit()
\ No newline at end of file
+if __name__ == "__main__":
+    sys.exit(main())
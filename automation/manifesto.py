@@ -0,0 +1,57 @@
+#
+# MANIFESTO DE ARQUIVOS GERADOS, COMPARTILHADO PELOS SCRIPTS
+#
+# Usado por gerar_folhaderosto (geração em lote) e separar_cotações: um JSON
+# em outdir que guarda, para cada arquivo gravado, o hash do conteúdo que o
+# originou junto com o mtime/tamanho do arquivo. Uma nova execução só regrava
+# os arquivos cujo hash mudou (ou que foram apagados/modificados fora do
+# script). Cada script tem o seu manifesto (nome) e o seu hash.
+#
+
+import os
+import json
+
+# ================================
+# LEITURA E GRAVAÇÃO
+# ================================
+def carregar_manifesto(outdir, nome):
+    """{nome do arquivo: registro} do manifesto `nome` em outdir ({} se não houver)."""
+    try:
+        with open(os.path.join(outdir, nome), encoding="utf-8") as f:
+            return json.load(f).get("arquivos", {})
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError, AttributeError):
+        # Manifesto ilegível: tudo será regravado e o manifesto reescrito
+        return {}
+
+def salvar_manifesto(outdir, nome, arquivos):
+    """Grava o manifesto de uma vez (arquivo temporário + os.replace)."""
+    os.makedirs(outdir, exist_ok=True)
+    caminho = os.path.join(outdir, nome)
+    temporario = caminho + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump({"arquivos": arquivos}, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(temporario, caminho)
+
+# ================================
+# REGISTROS
+# ================================
+def registro_manifesto(outdir, nome_arquivo, hash_conteudo):
+    """Registro do arquivo recém-gravado em outdir: hash, mtime e tamanho."""
+    estado = os.stat(os.path.join(outdir, nome_arquivo))
+    return {"hash": hash_conteudo, "mtime_ns": estado.st_mtime_ns, "tamanho": estado.st_size}
+
+def arquivo_inalterado(outdir, nome_arquivo, hash_conteudo, manifesto):
+    """True se o arquivo existe como foi gravado e o hash do conteúdo não mudou."""
+    registro = manifesto.get(nome_arquivo)
+    if not registro or registro.get("hash") != hash_conteudo:
+        return False
+    try:
+        estado = os.stat(os.path.join(outdir, nome_arquivo))
+    except OSError:
+        return False
+    return (
+        estado.st_mtime_ns == registro.get("mtime_ns")
+        and estado.st_size == registro.get("tamanho")
+    )
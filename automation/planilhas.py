@@ -0,0 +1,141 @@
+#
+# LEITURA DE PLANILHAS COMPARTILHADA PELOS SCRIPTS
+#
+# Um único ponto de leitura de Excel para gerar_folhaderosto, gerar_mescla,
+# separar_cotações (e precificar/histórico) e insert_cobertura_provedor:
+#   - motor "calamine" (python-calamine, em Rust) quando instalado, várias
+#     vezes mais rápido que o openpyxl; "openpyxl" caso contrário;
+#   - a escolha pode ser forçada pela variável de ambiente MOTOR_PLANILHA
+#     (auto, calamine ou openpyxl) ou pelo parâmetro `motor`;
+#   - a leitura linha a linha (abrir_planilha) usa o openpyxl em modo
+#     read_only: o calamine carrega a aba inteira na memória antes de
+#     iterar, o que anularia a memória limitada dos modos em streaming;
+#   - cabeçalhos normalizados do mesmo jeito em todos os scripts (sem
+#     espaços nas pontas; busca sem diferença de maiúsculas).
+# A escrita continua com openpyxl (modelos, estilos, write-only); o formato
+# do cabeçalho das planilhas geradas também é definido aqui.
+#
+
+import os
+import importlib.util
+from contextlib import contextmanager
+from datetime import date, datetime, time
+
+MOTORES = ("calamine", "openpyxl")
+MOTOR_PADRAO = os.getenv("MOTOR_PLANILHA", "auto")
+
+# ================================
+# MOTOR DE LEITURA
+# ================================
+def calamine_disponivel():
+    return importlib.util.find_spec("python_calamine") is not None
+
+def motor_leitura(motor=None):
+    """Resolve o motor ("auto" → calamine se instalado, senão openpyxl)."""
+    motor = (motor or MOTOR_PADRAO or "auto").strip().lower()
+    if motor == "auto":
+        return "calamine" if calamine_disponivel() else "openpyxl"
+    if motor not in MOTORES:
+        raise ValueError(f"Motor de leitura desconhecido: {motor} (use auto, {', '.join(MOTORES)}).")
+    if motor == "calamine" and not calamine_disponivel():
+        raise ImportError("Motor calamine indisponível: instale com pip install python-calamine.")
+    return motor
+
+# ================================
+# CABEÇALHOS
+# ================================
+def normalizar_cabecalho(valor):
+    """Nome de coluna como os scripts o comparam: texto sem espaços nas pontas."""
+    return "" if valor is None else str(valor).strip()
+
+def normalizar_cabecalhos(colunas):
+    return [normalizar_cabecalho(c) for c in colunas]
+
+def mapa_colunas(colunas):
+    """{NOME EM MAIÚSCULAS: nome original}, para achar colunas sem diferença de caixa."""
+    return {normalizar_cabecalho(c).upper(): c for c in colunas}
+
+def posicao_coluna(cabecalho, nome):
+    """Posição de `nome` no cabeçalho (sem diferença de caixa) ou None."""
+    maiusculas = [normalizar_cabecalho(c).upper() for c in cabecalho]
+    nome = normalizar_cabecalho(nome).upper()
+    return maiusculas.index(nome) if nome in maiusculas else None
+
+# ================================
+# LEITURA COM PANDAS
+# ================================
+def ler_excel(arquivo, motor=None, **opcoes):
+    """
+    pd.read_excel com o motor escolhido; com cabeçalho (header diferente de
+    None), os nomes das colunas já vêm normalizados. Com sheet_name=None,
+    retorna o dicionário de abas, todas normalizadas.
+    """
+    import pandas as pd
+
+    resultado = pd.read_excel(arquivo, engine=motor_leitura(motor), **opcoes)
+    if opcoes.get("header", 0) is not None:
+        for df in resultado.values() if isinstance(resultado, dict) else [resultado]:
+            df.columns = normalizar_cabecalhos(df.columns)
+    return resultado
+
+# ================================
+# LEITURA LINHA A LINHA
+# ================================
+def _valor_calamine(valor):
+    # Mesmos tipos que o openpyxl devolve: vazio → None, inteiro → int, data → datetime
+    if valor == "":
+        return None
+    if isinstance(valor, float) and valor.is_integer():
+        return int(valor)
+    if type(valor) is date:
+        return datetime.combine(valor, time())
+    return valor
+
+# Motor da leitura linha a linha: não segue MOTOR_PLANILHA (ver cabeçalho)
+MOTOR_LINHAS = "openpyxl"
+
+@contextmanager
+def abrir_planilha(arquivo, motor=None):
+    """
+    Abre a planilha só para leitura e fornece um iterador de (nome da aba,
+    linhas). As linhas são tuplas de valores, com células vazias como None
+    (como no openpyxl). Com o openpyxl (padrão) as linhas são lidas sob
+    demanda; com motor="calamine", cada aba é carregada inteira na memória
+    quando alcançada.
+    """
+    if motor_leitura(motor or MOTOR_LINHAS) == "calamine":
+        from python_calamine import CalamineWorkbook
+
+        wb = CalamineWorkbook.from_path(arquivo)
+
+        def linhas(nome):
+            aba = wb.get_sheet_by_name(nome)
+            # iter_rows começa na primeira coluna usada: recoloca as vazias à esquerda
+            vazias = (None,) * (aba.start[1] if aba.start else 0)
+            for valores in aba.iter_rows():
+                yield vazias + tuple(_valor_calamine(v) for v in valores)
+
+        try:
+            yield ((nome, linhas(nome)) for nome in wb.sheet_names)
+        finally:
+            if hasattr(wb, "close"):
+                wb.close()
+    else:
+        from openpyxl import load_workbook
+
+        wb = load_workbook(arquivo, read_only=True, data_only=True)
+        try:
+            yield ((ws.title, ws.iter_rows(values_only=True)) for ws in wb.worksheets)
+        finally:
+            wb.close()
+
+# ================================
+# ESCRITA
+# ================================
+def escrever_cabecalho(ws, colunas):
+    """
+    Cabeçalho das planilhas geradas (Mescla e cotações separadas): texto
+    simples, como o pandas.to_excel grava, para que os arquivos saiam iguais
+    pelo pandas e pelos escritores write-only do openpyxl.
+    """
+    ws.append(list(colunas))
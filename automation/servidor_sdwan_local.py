@@ -0,0 +1,150 @@
+#
+# SERVIDOR LOCAL QUE IMITA O PORTAL SDWAN (LOGIN, LOCALIZAR PONTO, INCLUIR COBERTURA)
+#
+# Para testar o motor HTTP (cobertura_http.py) sem tocar no portal real:
+#   > py ./automation/servidor_sdwan_local.py --porta 8765
+# e no .env:
+#   URL_SDWAN=http://127.0.0.1:8765/login
+#   URL_API_LOCALIZAR=http://127.0.0.1:8765/localizar
+#   URL_ADD_COBERTURA=http://127.0.0.1:8765/incluir
+#   SD_USER=teste / SD_PASS=teste
+#
+
+import sys
+import json
+import time
+import secrets
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+class PortalLocal(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, endereco, usuario="teste", senha="teste", latencia=0.0):
+        super().__init__(endereco, ManipuladorPortal)
+        self.usuario = usuario
+        self.senha = senha
+        self.latencia = latencia
+        self.sessoes = set()
+        # Coberturas incluídas: {cb_nome: formulário}
+        self.coberturas = {}
+        self.requisicoes = 0
+        self.trava = threading.Lock()
+
+class ManipuladorPortal(BaseHTTPRequestHandler):
+    # HTTP/1.1: conexões persistentes (keep-alive), como o portal
+    protocol_version = "HTTP/1.1"
+    # Cabeçalho e corpo num único envio, sem esperar o ACK (Nagle)
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def log_message(self, formato, *args):
+        pass
+
+    def _responder(self, status, corpo="", tipo="text/plain; charset=utf-8", cabecalhos=None):
+        dados = corpo.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(dados)))
+        for nome, valor in (cabecalhos or {}).items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def _formulario(self):
+        tamanho = int(self.headers.get("Content-Length") or 0)
+        return dict(parse_qsl(self.rfile.read(tamanho).decode("utf-8")))
+
+    def _autenticado(self):
+        for parte in (self.headers.get("Cookie") or "").split(";"):
+            nome, _, valor = parte.strip().partition("=")
+            if nome == "SESSAO" and valor in self.server.sessoes:
+                return True
+        return False
+
+    def do_GET(self):
+        if self.path.startswith("/portal.html"):
+            self._responder(200, "<html>portal</html>", "text/html; charset=utf-8")
+        else:
+            self._responder(200, "<html>login</html>", "text/html; charset=utf-8")
+
+    def do_POST(self):
+        servidor = self.server
+        formulario = self._formulario()
+        with servidor.trava:
+            servidor.requisicoes += 1
+        if servidor.latencia:
+            time.sleep(servidor.latencia)
+
+        if self.path.startswith("/login"):
+            if (formulario.get("set_Login"), formulario.get("set_pass")) != (servidor.usuario, servidor.senha):
+                self._responder(200, "Usuário ou senha inválidos")
+                return
+            sessao = secrets.token_hex(16)
+            with servidor.trava:
+                servidor.sessoes.add(sessao)
+            self._responder(302, cabecalhos={
+                "Location": "/portal.html",
+                "Set-Cookie": f"SESSAO={sessao}; Path=/; HttpOnly",
+            })
+            return
+
+        if not self._autenticado():
+            self._responder(302, cabecalhos={"Location": "/login"})
+            return
+
+        if self.path.startswith("/localizar"):
+            # "Cidade - UF" → campos do ponto; INEXISTENTE não é encontrado
+            cidade, _, uf = formulario.get("address", "").rpartition(" - ")
+            if not cidade or "INEXISTENTE" in cidade.upper():
+                campos = {"cb_Cidade": ""}
+            else:
+                campos = {"cb_Cidade": cidade, "cb_UF": uf, "cb_Lat": "-23.55", "cb_Lng": "-46.63"}
+            self._responder(200, json.dumps(campos), "application/json")
+            return
+
+        if self.path.startswith("/incluir"):
+            faltando = [c for c in ("cb_nome", "cb_Tecnologia", "address", "cb_Cidade") if not formulario.get(c)]
+            if faltando:
+                self._responder(400, f"Campos obrigatórios: {', '.join(faltando)}")
+                return
+            with servidor.trava:
+                servidor.coberturas[formulario["cb_nome"]] = formulario
+            self._responder(200, "Cobertura incluída com sucesso!")
+            return
+
+        self._responder(404, "Não encontrado")
+
+def iniciar_servidor(porta=0, usuario="teste", senha="teste", latencia=0.0):
+    """Sobe o portal local numa thread; retorna o servidor (server_address tem a porta)."""
+    servidor = PortalLocal(("127.0.0.1", porta), usuario, senha, latencia)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="servidor_sdwan_local",
+        description="Portal SDWAN local para testar o motor HTTP de inclusão de coberturas."
+    )
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--usuario", default="teste")
+    parser.add_argument("--senha", default="teste")
+    parser.add_argument("--latencia", type=float, default=0.0, help="segundos de espera por requisição")
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+
+    servidor = PortalLocal(("127.0.0.1", args.porta), args.usuario, args.senha, args.latencia)
+    print(f"Portal local em http://127.0.0.1:{args.porta} (Ctrl+C para encerrar)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+        print(f"{len(servidor.coberturas)} cobertura(s) incluída(s).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+#
+# TESTES DO MOTOR HTTP (cobertura_http.py) CONTRA O PORTAL LOCAL
+#
+# Rodar a partir da raiz do repositório:
+#   > py -m unittest discover -s automation/tests
+#
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+# Os scripts ficam em automation/, um nível acima
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import cobertura_http
+    from cobertura_http import FalhaPortal, SessaoPortal, incluir_cobertura, incluir_coberturas_http
+    from insert_cobertura_provedor import SUCESSO, FALHOU, SEM_CONFIRMACAO
+except ImportError as e:
+    # Mesmas dependências do script (python-dotenv, pandas)
+    raise unittest.SkipTest(f"Dependência ausente: {e.name}")
+
+from servidor_sdwan_local import ManipuladorPortal, iniciar_servidor
+
+
+class TestCoberturaHttp(unittest.TestCase):
+
+    def setUp(self):
+        self.servidor = iniciar_servidor(0)
+        self.addCleanup(self.servidor.server_close)
+        self.addCleanup(self.servidor.shutdown)
+
+        base = f"http://127.0.0.1:{self.servidor.server_address[1]}"
+        self.url_incluir = f"{base}/incluir"
+        # Configuração que viria do .env
+        for nome, valor in {
+            "URL_API_LOGIN": f"{base}/login",
+            "URL_API_LOCALIZAR": f"{base}/localizar",
+            "URL_API_INCLUIR": self.url_incluir,
+            "SD_USER": "teste",
+            "SD_PASS": "teste",
+            "TEXTO_SUCESSO": "",
+        }.items():
+            patcher = mock.patch.object(cobertura_http, nome, valor)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_login_recusado(self):
+        with mock.patch.object(cobertura_http, "SD_PASS", "errada"):
+            with self.assertRaises(FalhaPortal):
+                incluir_coberturas_http([("Campinas", "SP")], taxa=0)
+        self.assertEqual(self.servidor.coberturas, {})
+
+    def test_inclusao_e_cidade_inexistente(self):
+        relatorio = incluir_coberturas_http(
+            [("Campinas", "SP"), ("INEXISTENTE", "SP"), ("Santos", "SP")], concorrencia=2, taxa=0
+        )
+
+        self.assertEqual(list(relatorio["Cidade"]), ["Campinas", "INEXISTENTE", "Santos"])
+        self.assertEqual(list(relatorio["Status"]), [SUCESSO, FALHOU, SUCESSO])
+        self.assertIn("cidade não encontrada", relatorio["Mensagem"][1])
+        self.assertEqual(sorted(self.servidor.coberturas), ["Campinas - SP", "Santos - SP"])
+
+    def test_conexao_caida_na_inclusao(self):
+        # O portal inclui e derruba a conexão sem responder: não pode reenviar
+        responder = ManipuladorPortal._responder
+
+        def responder_sem_inclusao(manipulador, *args, **kwargs):
+            if manipulador.path.startswith("/incluir"):
+                manipulador.close_connection = True
+                return
+            responder(manipulador, *args, **kwargs)
+
+        with mock.patch.object(ManipuladorPortal, "_responder", responder_sem_inclusao):
+            relatorio = incluir_coberturas_http([("Campinas", "SP")], taxa=0)
+
+        self.assertEqual(list(relatorio["Status"]), [SEM_CONFIRMACAO])
+        self.assertEqual(list(self.servidor.coberturas), ["Campinas - SP"])
+        # Login, Localizar Ponto e uma única inclusão
+        self.assertEqual(self.servidor.requisicoes, 3)
+
+    def test_sessao_expirada(self):
+        # Sem login o portal redireciona ao login: não pode contar como inclusão
+        sessao = SessaoPortal(self.url_incluir)
+        self.addCleanup(sessao.fechar)
+        with self.assertRaisesRegex(FalhaPortal, "login"):
+            incluir_cobertura(sessao, "Campinas - SP", {"cb_Cidade": "Campinas"})
+        self.assertEqual(self.servidor.coberturas, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,12 +3,24 @@
 # Output: Mescla com todas as cotações.
 
 import os
+import re
+import sys
+import glob
+import json
+import time
+import hashlib
+import argparse
 import pandas as pd
-import tkinter as tk
-from tkinter import filedialog, messagebox
-from openpyxl import load_workbook
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from openpyxl import Workbook
+from openpyxl.cell.cell import WriteOnlyCell
 from openpyxl.styles import PatternFill
 
+# planilhas.py (leitura compartilhada) fica em automation/, um nível acima
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from planilhas import escrever_cabecalho, ler_excel, motor_leitura
+
 # --- Cabeçalhos esperados (A até AG), na ordem exata ---
 COLUMNS = [
     "Codigo","Produto","Velocidade","UF - A","Município - A","Endereço - A","CEP - A",
@@ -22,41 +34,22 @@ COLUMNS = [
     "Mensalidade 60 Meses líquido","Taxa de instalação líquida 60 meses","Observações"
 ]
 
-# --- GUI de seleção ---
-root = tk.Tk()
-root.withdraw()
-
-file_paths = filedialog.askopenfilenames(
-    title="Selecione as planilhas (todas com colunas A:AG)",
-    filetypes=[("Excel (*.xlsx, *.xls)", "*.xlsx *.xls"), ("All files", "*.*")]
-)
-if not file_paths:
-    print("Nenhum arquivo selecionado.")
-    raise SystemExit
-
-# Onde salvar
-output_file = filedialog.asksaveasfilename(
-    title="Salvar tabela mesclada como",
-    defaultextension=".xlsx",
-    filetypes=[("Excel (*.xlsx)", "*.xlsx")]
-)
-if not output_file:
-    print("Saída não escolhida.")
-    raise SystemExit
-
-# --- Leitura e normalização ---
-dataframes = []
-for file in file_paths:
+# Leitura em paralelo: número de processos (1 lê tudo no processo atual)
+TRABALHADORES = os.cpu_count() or 1
+
+# Cache local das cotações já lidas e normalizadas (limite em bytes, LRU)
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "dfh_cotacoes")
+CACHE_MAX_BYTES = 512 * 1024 * 1024
+# Muda sempre que a normalização (ou o motor de leitura) mudar, invalidando as entradas antigas
+VERSAO_CACHE = hashlib.sha256(json.dumps(["v1", motor_leitura()] + COLUMNS).encode("utf-8")).hexdigest()[:12]
+
+# --- Leitura e normalização de uma cotação ---
+def ler_cotacao(file):
     # Lê usando o cabeçalho da própria planilha (linha 1) e restringe às colunas A:AG
-    # (sem skiprows! isso evita o deslocamento)
-    try:
-        df = pd.read_excel(file, header=0, usecols="A:AG")
-    except Exception as e:
-        messagebox.showerror("Erro ao ler arquivo", f"{os.path.basename(file)}\n{e}")
-        continue
+    # (sem skiprows! isso evita o deslocamento); os nomes já vêm sem espaços extras
+    df = ler_excel(file, header=0, usecols="A:AG")
 
-    # Padroniza nomes (tira espaços extras) e força a ordem/nomes esperados
-    df.columns = [str(c).strip() for c in df.columns]
+    # Força a ordem/nomes esperados
     # Se vierem nomes diferentes mas a ordem estiver correta, forçamos os nomes esperados:
     if df.shape[1] == len(COLUMNS):
         df.columns = COLUMNS
@@ -75,45 +68,516 @@ for file in file_paths:
 
     # Adiciona a coluna de origem
     df["Cotação"] = os.path.basename(file)
+    return df
+
+def _ler_cotacao_segura(file):
+    # Nos processos auxiliares o erro volta como texto, sem interromper os demais
+    try:
+        return ler_cotacao(file), None
+    except Exception as e:
+        return None, str(e) or type(e).__name__
+
+# --- Cache das cotações ---
+# O índice guarda, por caminho, o tamanho/mtime e o hash do conteúdo (para não
+# recalcular o hash de arquivos intocados) e, por hash, o DataFrame
+# normalizado em disco (pickle) com a data do último uso. A coluna "Cotação"
+# não é guardada: depende do nome do arquivo, não do conteúdo.
+
+def _caminho_indice():
+    return os.path.join(CACHE_DIR, "indice.json")
+
+def carregar_indice_cache():
+    try:
+        with open(_caminho_indice(), encoding="utf-8") as f:
+            indice = json.load(f)
+        if indice.get("versao") == VERSAO_CACHE:
+            return indice
+    except (OSError, ValueError, AttributeError):
+        pass
+    return {"versao": VERSAO_CACHE, "caminhos": {}, "entradas": {}}
+
+def salvar_indice_cache(indice):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    temporario = _caminho_indice() + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(indice, f)
+    os.replace(temporario, _caminho_indice())
+
+def _hash_arquivo(file):
+    h = hashlib.sha256()
+    with open(file, "rb") as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+def chave_cache(file, indice):
+    """Hash do conteúdo do arquivo, reaproveitado se tamanho e mtime não mudaram."""
+    caminho = os.path.abspath(file)
+    estado = os.stat(caminho)
+    conhecido = indice["caminhos"].get(caminho)
+    if conhecido and conhecido["tamanho"] == estado.st_size and conhecido["mtime_ns"] == estado.st_mtime_ns:
+        return conhecido["hash"]
+
+    chave = _hash_arquivo(caminho)
+    indice["caminhos"][caminho] = {
+        "tamanho": estado.st_size,
+        "mtime_ns": estado.st_mtime_ns,
+        "hash": chave
+    }
+    return chave
+
+def ler_do_cache(chave, indice):
+    entrada = indice["entradas"].get(chave)
+    if not entrada:
+        return None
+    try:
+        df = pd.read_pickle(os.path.join(CACHE_DIR, entrada["arquivo"]))
+    except Exception:
+        # Entrada corrompida ou apagada: descarta e relê a planilha
+        del indice["entradas"][chave]
+        return None
+    entrada["acesso"] = time.time()
+    return df
 
-    # Se ainda restou algo, guarda
-    if not df.empty:
-        dataframes.append(df)
+def gravar_no_cache(chave, df, indice):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    nome = f"{chave}.pkl"
+    caminho = os.path.join(CACHE_DIR, nome)
+    df.drop(columns=["Cotação"]).to_pickle(caminho)
+    indice["entradas"][chave] = {
+        "arquivo": nome,
+        "tamanho": os.path.getsize(caminho),
+        "acesso": time.time()
+    }
 
-if not dataframes:
-    messagebox.showwarning("Aviso", "Nenhuma tabela com dados encontrada.")
-    raise SystemExit
+def podar_cache(indice, limite=None):
+    """Remove as entradas usadas há mais tempo até o cache caber no limite."""
+    limite = CACHE_MAX_BYTES if limite is None else limite
+    entradas = indice["entradas"]
+    total = sum(e["tamanho"] for e in entradas.values())
+    for chave in sorted(entradas, key=lambda c: entradas[c]["acesso"]):
+        if total <= limite:
+            break
+        total -= entradas[chave]["tamanho"]
+        try:
+            os.remove(os.path.join(CACHE_DIR, entradas[chave]["arquivo"]))
+        except FileNotFoundError:
+            pass
+        del entradas[chave]
 
-# --- Concatena verticalmente (uma embaixo da outra) ---
-merged_df = pd.concat(dataframes, ignore_index=True)
+    # Caminhos cujo hash não está mais no cache não precisam ser lembrados
+    indice["caminhos"] = {
+        caminho: info for caminho, info in indice["caminhos"].items()
+        if info["hash"] in entradas
+    }
 
-# --- Salva Excel (com cabeçalho único) ---
-merged_df.to_excel(output_file, index=False)
+def iterar_cotacoes(file_paths, trabalhadores=None, usar_cache=True):
+    """
+    Lê e normaliza as cotações em paralelo, entregando uma de cada vez.
+
+    Gera (arquivo, df, erro) na mesma ordem de file_paths (o que mantém
+    estável a coloração por bloco); df é None quando o arquivo não pôde ser
+    lido. No máximo 2 arquivos por processo ficam em memória aguardando
+    consumo, então o pico de memória acompanha o tamanho dos maiores
+    arquivos, não o total. Com usar_cache, só as planilhas novas ou alteradas
+    são lidas; as demais vêm do cache local (CACHE_DIR).
+    """
+    indice = carregar_indice_cache() if usar_cache else None
+    trabalhadores = min(trabalhadores or TRABALHADORES, len(file_paths)) or 1
+    executor = ProcessPoolExecutor(max_workers=trabalhadores) if trabalhadores > 1 else None
+    janela = trabalhadores * 2 if executor else 1
+
+    # Cada item: [arquivo, chave do cache, futuro, resultado (df, erro)]
+    pendentes = deque()
+
+    def concluir(item):
+        file, chave, futuro, resultado = item
+        if resultado is None:
+            df, erro = futuro.result()
+            if erro is None and chave:
+                gravar_no_cache(chave, df, indice)
+            resultado = (df, erro)
+        return (file,) + resultado
+
+    try:
+        for file in file_paths:
+            chave = None
+            if usar_cache:
+                try:
+                    chave = chave_cache(file, indice)
+                except OSError:
+                    # Arquivo inacessível: a leitura normal reporta o erro
+                    chave = None
+            df = ler_do_cache(chave, indice) if chave else None
+
+            if df is not None:
+                df["Cotação"] = os.path.basename(file)
+                pendentes.append((file, chave, None, (df, None)))
+            elif executor:
+                pendentes.append((file, chave, executor.submit(_ler_cotacao_segura, file), None))
+            else:
+                df, erro = _ler_cotacao_segura(file)
+                if erro is None and chave:
+                    gravar_no_cache(chave, df, indice)
+                pendentes.append((file, chave, None, (df, erro)))
+
+            while len(pendentes) >= janela:
+                yield concluir(pendentes.popleft())
+
+        while pendentes:
+            yield concluir(pendentes.popleft())
+    finally:
+        if executor:
+            executor.shutdown(cancel_futures=True)
+        if usar_cache:
+            podar_cache(indice)
+            salvar_indice_cache(indice)
+
+def ler_cotacoes(file_paths, trabalhadores=None, usar_cache=True):
+    """
+    Lê todas as cotações de uma vez (ver iterar_cotacoes).
+
+    Retorna (dataframes, erros): os DataFrames com dados, na ordem de
+    file_paths, e a lista de (arquivo, motivo) dos arquivos não lidos.
+    """
+    dataframes = []
+    erros = []
+    for file, df, erro in iterar_cotacoes(file_paths, trabalhadores, usar_cache):
+        if erro is not None:
+            erros.append((file, erro))
+        # Se ainda restou algo, guarda
+        elif not df.empty:
+            dataframes.append(df)
+
+    return dataframes, erros
 
 # --- Coloração alternada por bloco (cada arquivo uma cor) ---
-wb = load_workbook(output_file)
-ws = wb.active
+FILL_CLARO = PatternFill(start_color="BDD7EE", end_color="BDD7EE", fill_type="solid")  # azul claro
+FILL_ESCURO = PatternFill(start_color="5B9BD5", end_color="5B9BD5", fill_type="solid")  # azul escuro
+
+def _estilo(ws, **atributos):
+    # Estilo pronto para reaproveitar em todas as células de um bloco: evita
+    # registrar fill/fonte/borda de novo a cada célula escrita
+    modelo = WriteOnlyCell(ws)
+    for nome, valor in atributos.items():
+        setattr(modelo, nome, valor)
+    return modelo._style
+
+# --- Limite de linhas do Excel (1.048.576, menos o cabeçalho) ---
+LIMITE_LINHAS_EXCEL = 1_048_575
+
+def _nova_planilha(wb, titulo, colunas):
+    ws = wb.create_sheet(titulo)
+
+    # Congela o cabeçalho
+    ws.freeze_panes = "A2"
+
+    # Cabeçalho no mesmo formato das cotações separadas
+    escrever_cabecalho(ws, colunas)
+
+    # Os estilos pertencem ao workbook: são registrados em cada um
+    estilos = [_estilo(ws, fill=FILL_CLARO), _estilo(ws, fill=FILL_ESCURO)]
+    return ws, estilos
+
+def nome_fragmento(output_file, numero):
+    base, ext = os.path.splitext(output_file)
+    return f"{base}_{numero:03d}{ext}"
 
-fill1 = PatternFill(start_color="BDD7EE", end_color="BDD7EE", fill_type="solid")  # azul claro
-fill2 = PatternFill(start_color="5B9BD5", end_color="5B9BD5", fill_type="solid")  # azul escuro
+def fragmentos_existentes(output_file):
+    """Fragmentos numerados (<nome>_NNN.xlsx) já presentes ao lado de output_file."""
+    base, ext = os.path.splitext(output_file)
+    return sorted(glob.glob(glob.escape(base) + "_[0-9][0-9][0-9]" + glob.escape(ext)))
+
+def _publicar(gravados, output_file):
+    """
+    Troca a Mescla anterior pela nova: remove os fragmentos numerados de
+    execuções passadas (o separar_cotações lê todos os <nome>_NNN do
+    conjunto) e renomeia os temporários para os nomes finais.
+    """
+    finais = {final for _, final in gravados}
+    for antigo in fragmentos_existentes(output_file):
+        if antigo not in finais:
+            os.remove(antigo)
+    for temporario, final in gravados:
+        os.replace(temporario, final)
+
+def escrever_mescla(dataframes, output_file, limite_linhas=None, fragmentar="abas", colunas=None):
+    """
+    Grava a Mescla em uma única passada (workbook write-only): cabeçalho
+    único congelado e cada bloco (arquivo) com sua cor, aplicada enquanto as
+    linhas são emitidas.
+
+    dataframes pode ser qualquer iterável (inclusive um gerador): cada bloco
+    é descartado depois de escrito.
+
+    Quando as linhas passam de limite_linhas (no máximo o limite do Excel),
+    a Mescla é dividida sem partir nenhum bloco de "Cotação": em novas abas
+    (fragmentar="abas": Sheet1, Sheet2, ...) ou em novos arquivos
+    (fragmentar="arquivos": <nome>_001.xlsx, <nome>_002.xlsx, ...).
+
+    colunas: cabeçalho da Mescla (padrão: COLUMNS + "Cotação"); os blocos
+    devem trazer as colunas nessa ordem.
+
+    Os arquivos são gravados com nomes temporários e só recebem os nomes
+    finais quando tudo deu certo; fragmentos de uma Mescla anterior com o
+    mesmo nome são removidos nesse momento.
+
+    Retorna (blocos, linhas, arquivos gravados); sem nenhum bloco, nada é
+    gravado.
+    """
+    if fragmentar not in ("abas", "arquivos"):
+        raise ValueError(f"Modo de fragmentação desconhecido: '{fragmentar}'.")
+    limite = min(limite_linhas or LIMITE_LINHAS_EXCEL, LIMITE_LINHAS_EXCEL)
+    colunas = colunas or COLUMNS + ["Cotação"]
+
+    wb = Workbook(write_only=True)
+    ws, estilos = _nova_planilha(wb, "Sheet1", colunas)
+    fragmentos = 1
+    linhas_fragmento = 0
+    arquivos = []
+    # (temporário, nome final) de cada arquivo já salvo
+    gravados = []
+
+    def salvar(wb, final):
+        temporario = f"{final}.tmp"
+        gravados.append((temporario, final))
+        wb.save(temporario)
+
+    toggle = 0
+    blocos = 0
+    linhas = 0
+
+    try:
+        for df in dataframes:
+            if len(df) > limite:
+                # Encerra as abas abertas para não deixar arquivos temporários
+                for aberta in wb.worksheets:
+                    aberta.close()
+                raise ValueError(
+                    f"A cotação '{df['Cotação'].iloc[0]}' tem {len(df)} linhas, "
+                    f"acima do limite de {limite} linhas por fragmento."
+                )
+
+            # O bloco não cabe no fragmento atual: começa outro
+            if linhas_fragmento and linhas_fragmento + len(df) > limite:
+                fragmentos += 1
+                linhas_fragmento = 0
+                if fragmentar == "abas":
+                    ws, estilos = _nova_planilha(wb, f"Sheet{fragmentos}", colunas)
+                else:
+                    if fragmentos == 2:
+                        # O primeiro arquivo também passa a ser numerado
+                        arquivos.append(nome_fragmento(output_file, 1))
+                    salvar(wb, arquivos[-1])
+                    arquivos.append(nome_fragmento(output_file, fragmentos))
+                    wb = Workbook(write_only=True)
+                    ws, estilos = _nova_planilha(wb, "Sheet1", colunas)
+
+            blocos += 1
+            linhas += len(df)
+            linhas_fragmento += len(df)
+            estilo = estilos[toggle]
+            # NaN/NA viram células vazias, como no to_excel
+            valores = df.astype(object).where(df.notna(), None)
+            for linha in valores.itertuples(index=False, name=None):
+                celulas = []
+                for valor in linha:
+                    cell = WriteOnlyCell(ws, value=valor)
+                    cell._style = estilo
+                    celulas.append(cell)
+                ws.append(celulas)
+            toggle = 1 - toggle
+
+        if blocos:
+            if not arquivos:
+                arquivos.append(output_file)
+            salvar(wb, arquivos[-1])
+    except BaseException:
+        # Nada é publicado: descarta os temporários já salvos
+        for temporario, _ in gravados:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+        raise
+
+    if gravados:
+        _publicar(gravados, output_file)
+    return blocos, linhas, arquivos
+
+# --- API ---
+def expandir_entradas(entradas):
+    """
+    Converte diretórios, padrões glob e arquivos na lista de planilhas a
+    mesclar (ordenada dentro de cada entrada, sem repetições nem temporários
+    do Excel "~$...").
+    """
+    file_paths = []
+    for entrada in entradas:
+        if os.path.isdir(entrada):
+            encontrados = glob.glob(os.path.join(entrada, "*.xlsx")) + glob.glob(os.path.join(entrada, "*.xls"))
+        elif glob.has_magic(entrada):
+            encontrados = glob.glob(entrada)
+        else:
+            encontrados = [entrada]
+        for file in sorted(encontrados):
+            if os.path.basename(file).startswith("~$"):
+                continue
+            if file not in file_paths:
+                file_paths.append(file)
+    return file_paths
+
+def merge_quotations(
+    paths,
+    output,
+    trabalhadores=None,
+    usar_cache=True,
+    limite_linhas=None,
+    fragmentar="abas"
+):
+    """
+    Mescla as cotações de paths (arquivos, diretórios ou globs) em output.
+
+    limite_linhas/fragmentar: divisão da Mescla em abas ou arquivos
+    numerados (ver escrever_mescla).
+    Retorna {"arquivos": blocos gravados, "linhas": total de linhas,
+    "saidas": arquivos gravados, "erros": [(arquivo, motivo)]}. Se nenhuma
+    planilha tiver dados, nada é gravado e "arquivos" é 0.
+    """
+    file_paths = expandir_entradas(paths)
+    # A própria Mescla (ou seus fragmentos) pode estar no diretório de entrada
+    base_saida = os.path.splitext(os.path.abspath(output))[0]
+    file_paths = [
+        f for f in file_paths
+        if os.path.abspath(f) != os.path.abspath(output)
+        and not re.fullmatch(re.escape(base_saida) + r"_\d{3}\.xlsx", os.path.abspath(f))
+    ]
+
+    erros = []
+
+    # --- Leitura e normalização, um arquivo por vez ---
+    def blocos():
+        for file, df, erro in iterar_cotacoes(file_paths, trabalhadores, usar_cache):
+            if erro is not None:
+                erros.append((file, erro))
+            # Se ainda restou algo, vai direto para a Mescla
+            elif not df.empty:
+                yield df
+
+    # --- Grava a Mescla em uma única passada, já colorida ---
+    arquivos, linhas, saidas = escrever_mescla(blocos(), output, limite_linhas, fragmentar)
+
+    return {"arquivos": arquivos, "linhas": linhas, "saidas": saidas, "erros": erros}
+
+# --- GUI de seleção ---
+def main_gui():
+    import tkinter as tk
+    from tkinter import filedialog, messagebox
+
+    root = tk.Tk()
+    root.withdraw()
+
+    file_paths = filedialog.askopenfilenames(
+        title="Selecione as planilhas (todas com colunas A:AG)",
+        filetypes=[("Excel (*.xlsx, *.xls)", "*.xlsx *.xls"), ("All files", "*.*")]
+    )
+    if not file_paths:
+        print("Nenhum arquivo selecionado.")
+        raise SystemExit
+
+    # Onde salvar
+    output_file = filedialog.asksaveasfilename(
+        title="Salvar tabela mesclada como",
+        defaultextension=".xlsx",
+        filetypes=[("Excel (*.xlsx)", "*.xlsx")]
+    )
+    if not output_file:
+        print("Saída não escolhida.")
+        raise SystemExit
+
+    try:
+        resultado = merge_quotations(list(file_paths), output_file)
+    except ValueError as e:
+        messagebox.showerror("Erro", str(e))
+        raise SystemExit
+    erros = resultado["erros"]
+
+    # Falhas de leitura: um único aviso ao final, com todos os arquivos
+    if erros:
+        for file, erro in erros:
+            print(f"⚠ Erro ao ler {os.path.basename(file)}: {erro}")
+        messagebox.showerror(
+            "Erro ao ler arquivos",
+            f"{len(erros)} arquivo(s) não puderam ser lidos e foram ignorados:\n\n"
+            + "\n".join(f"{os.path.basename(file)}: {erro}" for file, erro in erros[:15])
+            + (f"\n... e mais {len(erros) - 15} (ver console)" if len(erros) > 15 else "")
+        )
+
+    if not resultado["arquivos"]:
+        messagebox.showwarning("Aviso", "Nenhuma tabela com dados encontrada.")
+        raise SystemExit
+
+    saidas = "\n".join(resultado["saidas"])
+    messagebox.showinfo("Tudo certo!", f"Mesclagem concluída.\nArquivo salvo em:\n{saidas}")
+    print(f"Mesclagem concluída! Arquivo salvo como {saidas}")
+
+# --- Linha de comando ---
+def main(argv=None):
+    """
+    Sem argumentos abre a seleção gráfica. Sem interface:
+      py gerar_mescla.py <diretório|glob|arquivo> [...] -o Mescla.xlsx
+    Retorna 0 em caso de sucesso, 1 se algum arquivo falhar e 2 se não houver
+    dados ou se a Mescla não puder ser dividida no limite de linhas.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        main_gui()
+        return 0
+
+    parser = argparse.ArgumentParser(
+        prog="gerar_mescla",
+        description="Mescla as planilhas de cotação do portal Vivo em uma única planilha."
+    )
+    parser.add_argument("entradas", nargs="+", help="diretórios, padrões glob ou arquivos .xlsx")
+    parser.add_argument("-o", "--saida", required=True, help="arquivo da Mescla (.xlsx)")
+    parser.add_argument("--trabalhadores", type=int, default=None)
+    parser.add_argument("--sem-cache", action="store_true", help="relê todas as planilhas")
+    parser.add_argument(
+        "--limite-linhas", type=int, default=None,
+        help=f"linhas por aba/arquivo (padrão e máximo: {LIMITE_LINHAS_EXCEL})"
+    )
+    parser.add_argument(
+        "--fragmentar", choices=["abas", "arquivos"], default="abas",
+        help="como dividir a Mescla acima do limite de linhas"
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        resultado = merge_quotations(
+            args.entradas,
+            args.saida,
+            args.trabalhadores,
+            not args.sem_cache,
+            args.limite_linhas,
+            args.fragmentar
+        )
+    except ValueError as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        return 2
 
-start_row = 2  # após o cabeçalho
-toggle = True
-max_col = ws.max_column  # inclui a coluna "Cotação"
+    for file, erro in resultado["erros"]:
+        print(f"⚠ Erro ao ler {os.path.basename(file)}: {erro}", file=sys.stderr)
 
-for df in dataframes:
-    rows_count = len(df)
-    fill = fill1 if toggle else fill2
-    for r in range(start_row, start_row + rows_count):
-        for c in range(1, max_col + 1):
-            ws.cell(row=r, column=c).fill = fill
-    start_row += rows_count
-    toggle = not toggle
+    if not resultado["arquivos"]:
+        print("Nenhuma tabela com dados encontrada.", file=sys.stderr)
+        return 2
 
-# (opcional) Congela o cabeçalho
-ws.freeze_panes = "A2"
+    print(
+        f"Mesclagem concluída! {resultado['arquivos']} cotações, "
+        f"{resultado['linhas']} linhas. Arquivo(s) salvo(s): {', '.join(resultado['saidas'])}"
+    )
+    return 1 if resultado["erros"] else 0
 
-wb.save(output_file)
 
-messagebox.showinfo("Tudo certo!", f"Mesclagem concluída.\nArquivo salvo em:\n{output_file}")
-print(f"Mesclagem concluída! Arquivo salvo como {output_file}")
\ No newline at end of file
+# O processamento fica sob o guard: os processos de leitura reimportam este
+# módulo (spawn no Windows) e não podem abrir a interface novamente.
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,441 @@
+# Histórico das cotações já separadas (SQLite local)
+# Input: cotações gravadas pelo separar_cotações.py; Mescla nova a cotar.
+# Output: Mescla anotada com o ponto cotado mais próximo (preços e data).
+
+import os
+import sys
+import math
+import sqlite3
+import argparse
+from datetime import date
+
+from separar_cotações import PREFIXO_HISTORICO, arquivos_da_mescla
+
+# planilhas.py (leitura compartilhada) fica em automation/, um nível acima
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from planilhas import abrir_planilha, mapa_colunas, posicao_coluna
+
+# --- Local do histórico (ao lado das cotações separadas) ---
+HISTORICO_PATH = os.path.normpath(os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..", "outdir", "historico_cotacoes.sqlite"
+))
+
+# Distância máxima (metros) para reaproveitar o preço de um ponto já cotado
+RAIO_METROS = 200
+
+# Índice espacial: grade de células de TAMANHO_CELULA graus (~1,1 km no
+# equador); cada ponto é gravado com o número da sua célula e a busca só
+# olha as células vizinhas que o raio alcança
+TAMANHO_CELULA = 0.01
+COLUNAS_GRADE = int(360 / TAMANHO_CELULA) + 1
+METROS_POR_GRAU = 111_320
+# Acima disso a busca lê uma faixa de células em vez de listar uma a uma
+LIMITE_CELULAS_BUSCA = 20_000
+RAIO_TERRA = 6_371_000
+
+# --- Colunas de preço guardadas (nome na planilha → coluna no SQLite) ---
+CAMPOS_PRECO = []
+for _meses in (12, 24, 36, 48, 60):
+    CAMPOS_PRECO.append((f"Mensalidade {_meses} Meses líquido", f"mensalidade_{_meses}"))
+    CAMPOS_PRECO.append((f"Taxa de instalação líquida {_meses} meses", f"taxa_instalacao_{_meses}"))
+
+# Colunas acrescentadas à Mescla na anotação
+COLUNAS_ANOTACAO = (
+    [PREFIXO_HISTORICO + nome for nome in ("Cotação", "Data", "Distância (m)")]
+    + [PREFIXO_HISTORICO + coluna for coluna, _ in CAMPOS_PRECO]
+)
+
+# --- Banco ---
+def abrir_historico(caminho=None):
+    caminho = caminho or HISTORICO_PATH
+    pasta = os.path.dirname(caminho)
+    if pasta:
+        os.makedirs(pasta, exist_ok=True)
+    con = sqlite3.connect(caminho)
+    precos = ", ".join(campo for _, campo in CAMPOS_PRECO)
+    tabela = f"""
+        CREATE TABLE IF NOT EXISTS pontos (
+            mescla TEXT NOT NULL DEFAULT '',
+            cotacao TEXT NOT NULL,
+            linha INTEGER NOT NULL,
+            data TEXT,
+            produto TEXT,
+            velocidade TEXT,
+            latitude REAL NOT NULL,
+            longitude REAL NOT NULL,
+            celula INTEGER NOT NULL,
+            {precos},
+            PRIMARY KEY (mescla, cotacao, linha)
+        );
+        CREATE INDEX IF NOT EXISTS pontos_celula ON pontos (celula);
+    """
+    # Históricos antigos usavam só (cotacao, linha) como chave: cotações de
+    # mesmo nome em outra Mescla apagavam os pontos da anterior
+    colunas = sorted(con.execute("PRAGMA table_info(pontos)"), key=lambda c: c[5])
+    if [c[1] for c in colunas if c[5]] == ["cotacao", "linha"]:
+        nomes = ", ".join(c[1] for c in colunas if c[1] != "mescla")
+        with con:
+            con.execute("DROP INDEX IF EXISTS pontos_celula")
+            con.execute("ALTER TABLE pontos RENAME TO pontos_antigos")
+            con.executescript(tabela)
+            con.execute(
+                f"INSERT INTO pontos (mescla, {nomes}) "
+                f"SELECT COALESCE(mescla, ''), {nomes} FROM pontos_antigos"
+            )
+            con.execute("DROP TABLE pontos_antigos")
+    con.executescript(tabela)
+    return con
+
+def coordenada(valor):
+    """Float de uma latitude/longitude ("-23,55" ou -23.55); None se inválida."""
+    if valor is None:
+        return None
+    try:
+        numero = float(str(valor).strip().replace(",", "."))
+    except ValueError:
+        return None
+    return numero if math.isfinite(numero) else None
+
+def celula(latitude, longitude):
+    linha = math.floor((latitude + 90) / TAMANHO_CELULA)
+    coluna = math.floor((longitude + 180) / TAMANHO_CELULA)
+    return linha * COLUNAS_GRADE + coluna
+
+# --- Registro das cotações separadas ---
+def registrar_arquivo(con, arquivo, mescla=None):
+    """
+    Grava no histórico os pontos cotados (com coordenadas da ponta A e ao
+    menos um preço) de uma planilha gerada pelo separar_cotações. Os pontos
+    anteriores da mesma cotação na mesma Mescla são substituídos; os de
+    cotações homônimas de outras Mesclas ficam. Retorna quantos gravou.
+    """
+    mescla = mescla or ""
+    cotacao = os.path.basename(arquivo)
+    if cotacao.lower().endswith(".xlsx"):
+        cotacao = cotacao[:-5]
+    data = date.fromtimestamp(os.path.getmtime(arquivo)).isoformat()
+
+    with abrir_planilha(arquivo) as abas:
+        _, linhas = next(abas)
+        cabecalho = list(next(linhas, ()))
+
+        def posicao(nome):
+            return posicao_coluna(cabecalho, nome)
+
+        pos_lat = posicao("Latitude - A")
+        pos_lon = posicao("Longitude - A")
+        pos_produto = posicao("Produto")
+        pos_velocidade = posicao("Velocidade")
+        pos_precos = [posicao(coluna) for coluna, _ in CAMPOS_PRECO]
+        if pos_lat is None or pos_lon is None:
+            return 0
+
+        def valor(valores, pos):
+            return valores[pos] if pos is not None and pos < len(valores) else None
+
+        registros = []
+        for numero, valores in enumerate(linhas, start=2):
+            latitude = coordenada(valor(valores, pos_lat))
+            longitude = coordenada(valor(valores, pos_lon))
+            if latitude is None or longitude is None or not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+                continue
+            precos = [valor(valores, pos) for pos in pos_precos]
+            if all(p is None or str(p).strip() == "" for p in precos):
+                continue
+            registros.append(
+                [cotacao, numero, mescla, data, valor(valores, pos_produto), valor(valores, pos_velocidade),
+                 latitude, longitude, celula(latitude, longitude)] + precos
+            )
+
+    campos = ", ".join(campo for _, campo in CAMPOS_PRECO)
+    marcadores = ", ".join("?" * (9 + len(CAMPOS_PRECO)))
+    with con:
+        con.execute("DELETE FROM pontos WHERE mescla = ? AND cotacao = ?", (mescla, cotacao))
+        con.executemany(
+            f"INSERT INTO pontos (cotacao, linha, mescla, data, produto, velocidade, latitude, longitude, "
+            f"celula, {campos}) VALUES ({marcadores})",
+            registros
+        )
+    return len(registros)
+
+def registrar_pasta(outdir, arquivos=None, caminho=None):
+    """Registra as planilhas de uma pasta de cotações separadas (todas, por padrão)."""
+    if arquivos is None:
+        arquivos = sorted(
+            nome for nome in os.listdir(outdir)
+            if nome.lower().endswith(".xlsx") and not nome.startswith("~$")
+        )
+    mescla = os.path.basename(os.path.normpath(outdir))
+
+    pontos = 0
+    erros = []
+    con = abrir_historico(caminho)
+    try:
+        for nome in arquivos:
+            try:
+                pontos += registrar_arquivo(con, os.path.join(outdir, nome), mescla)
+            except Exception as e:
+                erros.append((nome, str(e) or type(e).__name__))
+    finally:
+        con.close()
+    return {"arquivos": len(arquivos) - len(erros), "pontos": pontos, "erros": erros}
+
+def registrar_separacao(resultado, caminho=None):
+    """
+    Alimenta o histórico com o resultado do separar_cotações (só os arquivos
+    regravados: os inalterados já foram registrados). Retorna
+    {"arquivos", "pontos", "erros": [(arquivo, motivo)]}.
+    """
+    return registrar_pasta(
+        resultado["outdir"], [nome for nome, _ in resultado["gerados"]], caminho
+    )
+
+# --- Busca do vizinho mais próximo (em lote) ---
+def _coordenadas(serie):
+    import pandas as pd
+
+    texto = serie.astype("string").str.strip().str.replace(",", ".", regex=False)
+    return pd.to_numeric(texto, errors="coerce").astype("float64")
+
+def pontos_proximos(consultas, raio=None, caminho=None):
+    """
+    Para cada linha de consultas (colunas Produto, Velocidade, Latitude - A
+    e Longitude - A), o ponto do histórico mais próximo, do mesmo produto e
+    velocidade, a até raio metros (empate: o mais recente).
+
+    Tudo em lote: as consultas são expandidas para as células vizinhas da
+    grade, cruzadas com os pontos do histórico dessas células num único
+    join e a distância (haversine) é calculada vetorizada.
+
+    Retorna um DataFrame com o mesmo índice de consultas e as colunas
+    COLUNAS_ANOTACAO (vazias quando não há ponto no raio).
+    """
+    import numpy as np
+    import pandas as pd
+    from precificar_mescla import normalizar_chave
+
+    raio = RAIO_METROS if raio is None else raio
+    anotacoes = pd.DataFrame(index=consultas.index, columns=COLUNAS_ANOTACAO, dtype=object)
+
+    lat = _coordenadas(consultas["Latitude - A"]).to_numpy()
+    lon = _coordenadas(consultas["Longitude - A"]).to_numpy()
+    validas = np.isfinite(lat) & np.isfinite(lon) & (np.abs(lat) <= 90) & (np.abs(lon) <= 180)
+    if not validas.any():
+        return anotacoes
+
+    posicoes = np.flatnonzero(validas)
+    lat, lon = lat[validas], lon[validas]
+    produto = normalizar_chave(consultas["Produto"]).to_numpy()[validas]
+    velocidade = normalizar_chave(consultas["Velocidade"], sem_espacos=True).to_numpy()[validas]
+
+    # Células vizinhas alcançadas pelo raio (a largura em longitude encolhe
+    # com a latitude: usa a latitude mais distante do equador)
+    passo_lat = math.ceil(raio / (METROS_POR_GRAU * TAMANHO_CELULA))
+    cos_lat = max(math.cos(math.radians(min(float(np.abs(lat).max()), 89.0))), 1e-6)
+    passo_lon = math.ceil(raio / (METROS_POR_GRAU * TAMANHO_CELULA * cos_lat))
+    deslocamentos = np.array([
+        d_lat * COLUNAS_GRADE + d_lon
+        for d_lat in range(-passo_lat, passo_lat + 1)
+        for d_lon in range(-passo_lon, passo_lon + 1)
+    ])
+    base = (
+        np.floor((lat + 90) / TAMANHO_CELULA).astype("int64") * COLUNAS_GRADE
+        + np.floor((lon + 180) / TAMANHO_CELULA).astype("int64")
+    )
+    vizinhas = (base[:, None] + deslocamentos[None, :]).ravel()
+
+    con = abrir_historico(caminho)
+    try:
+        historico = _pontos_nas_celulas(con, pd.unique(vizinhas))
+        if historico.empty:
+            return anotacoes
+
+        historico["produto"] = normalizar_chave(historico["produto"])
+        historico["velocidade"] = normalizar_chave(historico["velocidade"], sem_espacos=True)
+
+        candidatos = pd.DataFrame({
+            "consulta": np.repeat(np.arange(len(base)), len(deslocamentos)),
+            "celula": vizinhas,
+            "produto": np.repeat(produto, len(deslocamentos)),
+            "velocidade": np.repeat(velocidade, len(deslocamentos)),
+        }).merge(historico, on=["celula", "produto", "velocidade"])
+        if candidatos.empty:
+            return anotacoes
+
+        # Haversine vetorizado
+        lat1 = np.radians(lat[candidatos["consulta"].to_numpy()])
+        lon1 = np.radians(lon[candidatos["consulta"].to_numpy()])
+        lat2 = np.radians(candidatos["latitude"].to_numpy())
+        lon2 = np.radians(candidatos["longitude"].to_numpy())
+        a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+        candidatos["distancia"] = 2 * RAIO_TERRA * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+        candidatos = candidatos[candidatos["distancia"] <= raio]
+        if candidatos.empty:
+            return anotacoes
+        melhores = (
+            candidatos.sort_values(["consulta", "distancia", "data"], ascending=[True, True, False])
+            .drop_duplicates("consulta")
+        )
+
+        # Preços só dos pontos escolhidos
+        melhores = melhores.merge(_precos_dos_pontos(con, melhores["id"]), on="id", how="left")
+    finally:
+        con.close()
+
+    linhas = consultas.index[posicoes[melhores["consulta"].to_numpy()]]
+    valores = {
+        PREFIXO_HISTORICO + "Cotação": melhores["cotacao"],
+        PREFIXO_HISTORICO + "Data": melhores["data"],
+        PREFIXO_HISTORICO + "Distância (m)": melhores["distancia"].round(1),
+    }
+    for coluna, campo in CAMPOS_PRECO:
+        valores[PREFIXO_HISTORICO + coluna] = melhores[campo]
+    for coluna, serie in valores.items():
+        anotacoes.loc[linhas, coluna] = serie.to_numpy()
+    return anotacoes
+
+def _pontos_nas_celulas(con, celulas):
+    # Só a geometria e as chaves (os preços vêm depois, dos escolhidos).
+    # Poucas células vão para uma tabela temporária; muitas (Mescla espalhada
+    # pelo país) viram uma faixa de células, que o join com as consultas filtra
+    import pandas as pd
+
+    consulta = (
+        "SELECT p.rowid AS id, p.celula, p.data, p.produto, p.velocidade, p.latitude, p.longitude "
+        "FROM pontos p "
+    )
+    if len(celulas) <= LIMITE_CELULAS_BUSCA:
+        con.execute("CREATE TEMP TABLE celulas_busca (celula INTEGER PRIMARY KEY)")
+        con.executemany("INSERT INTO celulas_busca VALUES (?)", ((c,) for c in celulas.tolist()))
+        return pd.read_sql_query(consulta + "JOIN celulas_busca c ON c.celula = p.celula", con)
+    return pd.read_sql_query(
+        consulta + "WHERE p.celula BETWEEN ? AND ?", con,
+        params=(int(celulas.min()), int(celulas.max()))
+    )
+
+def _precos_dos_pontos(con, ids):
+    import pandas as pd
+
+    campos = ", ".join(f"p.{campo}" for _, campo in CAMPOS_PRECO)
+    con.execute("CREATE TEMP TABLE pontos_escolhidos (id INTEGER PRIMARY KEY)")
+    con.executemany("INSERT INTO pontos_escolhidos VALUES (?)", ((i,) for i in pd.unique(ids).tolist()))
+    return pd.read_sql_query(
+        f"SELECT p.rowid AS id, p.cotacao, {campos} FROM pontos p JOIN pontos_escolhidos e ON e.id = p.rowid",
+        con
+    )
+
+# --- Anotação da Mescla ---
+def anotar_mescla(
+    entrada,
+    saida=None,
+    raio=None,
+    caminho=None,
+    limite_linhas=None,
+    fragmentar="abas"
+):
+    """
+    Acrescenta à Mescla entrada (inteira ou fragmentada) as colunas
+    COLUNAS_ANOTACAO com o ponto já cotado mais próximo de cada linha e grava
+    em saida (padrão: <Mescla>_historico.xlsx). As colunas não são gravadas
+    pelo separar_cotações.
+
+    Retorna {"linhas", "anotadas", "saidas"}.
+    """
+    from gerar_mescla import escrever_mescla
+    from separar_cotações import coluna_de_controle, ler_mescla
+    from precificar_mescla import blocos_por_cotacao
+
+    nome_base, arquivos = arquivos_da_mescla(entrada)
+    if saida is None:
+        saida = os.path.join(os.path.dirname(entrada), f"{nome_base}_historico.xlsx")
+
+    mescla = ler_mescla(arquivos)
+    # Uma Mescla já anotada é anotada de novo
+    mescla = mescla.drop(columns=[
+        c for c in mescla.columns if c.upper().startswith(PREFIXO_HISTORICO.upper())
+    ])
+    col_lookup = mapa_colunas(mescla.columns)
+    faltando = [
+        c for c in ("Produto", "Velocidade", "Latitude - A", "Longitude - A", "Cotação")
+        if c.upper() not in col_lookup
+    ]
+    if faltando:
+        raise ValueError(f"Mescla sem a(s) coluna(s): {', '.join(faltando)}.")
+    consultas = mescla.rename(columns={col_lookup[c.upper()]: c for c in (
+        "Produto", "Velocidade", "Latitude - A", "Longitude - A", "Cotação"
+    )})
+
+    anotacoes = pontos_proximos(consultas, raio, caminho)
+    anotada = consultas.join(anotacoes)
+
+    # Colunas de controle sempre ao final, depois de Cotação
+    colunas = (
+        [c for c in anotada.columns if not coluna_de_controle(c)]
+        + [c for c in anotada.columns if coluna_de_controle(c)]
+    )
+    anotada = anotada[colunas]
+    _, linhas, saidas = escrever_mescla(
+        blocos_por_cotacao(anotada), saida, limite_linhas, fragmentar, colunas
+    )
+
+    return {
+        "linhas": linhas,
+        "anotadas": int(anotacoes[PREFIXO_HISTORICO + "Cotação"].notna().sum()),
+        "saidas": saidas,
+    }
+
+# --- Linha de comando ---
+def main(argv=None):
+    """
+      py historico_cotacoes.py registrar outdir/<Mescla> [...]
+      py historico_cotacoes.py anotar Mescla.xlsx [-o saida.xlsx] [--raio 200]
+    Retorna 0 em caso de sucesso, 1 se algum arquivo não puder ser
+    registrado e 2 em caso de erro.
+    """
+    parser = argparse.ArgumentParser(
+        prog="historico_cotacoes",
+        description="Histórico local das cotações separadas e reaproveitamento de preços por proximidade."
+    )
+    parser.add_argument("--historico", default=None, help=f"banco SQLite (padrão: {HISTORICO_PATH})")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    registrar = comandos.add_parser("registrar", help="registra pastas geradas pelo separar_cotações")
+    registrar.add_argument("pastas", nargs="+", help="pastas outdir/<Mescla>")
+
+    anotar = comandos.add_parser("anotar", help="anota a Mescla com o ponto já cotado mais próximo")
+    anotar.add_argument("mescla", help="Mescla gerada pelo gerar_mescla (ou um de seus fragmentos)")
+    anotar.add_argument("-o", "--saida", default=None, help="padrão: <Mescla>_historico.xlsx")
+    anotar.add_argument("--raio", type=float, default=RAIO_METROS, help=f"metros (padrão: {RAIO_METROS})")
+    anotar.add_argument("--limite-linhas", type=int, default=None)
+    anotar.add_argument("--fragmentar", choices=["abas", "arquivos"], default="abas")
+
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+
+    try:
+        if args.comando == "registrar":
+            erros = []
+            for pasta in args.pastas:
+                resultado = registrar_pasta(pasta, caminho=args.historico)
+                erros += resultado["erros"]
+                print(f"{pasta}: {resultado['arquivos']} cotações, {resultado['pontos']} pontos registrados")
+            for nome, erro in erros:
+                print(f"⚠ Erro ao registrar {nome}: {erro}", file=sys.stderr)
+            return 1 if erros else 0
+
+        resultado = anotar_mescla(
+            args.mescla, args.saida, args.raio, args.historico, args.limite_linhas, args.fragmentar
+        )
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        return 2
+
+    print(
+        f"{resultado['anotadas']} de {resultado['linhas']} linhas com ponto já cotado a até "
+        f"{args.raio:g} m. Arquivo(s) salvo(s): {', '.join(resultado['saidas'])}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
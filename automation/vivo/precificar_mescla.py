@@ -0,0 +1,391 @@
+# Etapa intermediária da cotação
+# Input: Mescla gerada pelo gerar_mescla.py + tabela de tarifas.
+# Output: Mescla com mensalidades e taxas preenchidas, pronta para o separar_cotações.py.
+
+import os
+import sys
+import time
+import argparse
+import pandas as pd
+
+from gerar_mescla import COLUMNS, LIMITE_LINHAS_EXCEL, escrever_mescla
+from separar_cotações import COLUNA_REGRA, arquivos_da_mescla, ler_mescla
+
+# planilhas.py (leitura compartilhada) fica em automation/, um nível acima
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from planilhas import ler_excel, mapa_colunas, normalizar_cabecalhos
+
+# --- Colunas de preço preenchidas pela tarifa (12 a 60 meses) ---
+COLUNAS_TARIFA = [
+    "Mensalidade 12 Meses líquido","Taxa de instalação líquida 12 meses",
+    "Mensalidade 24 Meses líquido","Taxa de instalação líquida 24 meses",
+    "Mensalidade 36 Meses líquido","Taxa de instalação líquida 36 meses",
+    "Mensalidade 48 Meses líquido","Taxa de instalação líquida 48 meses",
+    "Mensalidade 60 Meses líquido","Taxa de instalação líquida 60 meses"
+]
+
+# --- Chaves da tabela de tarifas e coluna correspondente na Mescla (ponta A) ---
+CHAVES_TARIFA = {
+    "Produto": "Produto",
+    "Velocidade": "Velocidade",
+    "UF": "UF - A",
+    "Município": "Município - A",
+}
+
+# Regras em ordem de prioridade: a linha da tarifa pertence à regra formada
+# pelas chaves que ela preenche (Município em branco = vale para a UF toda,
+# UF e Município em branco = vale para o país)
+REGRAS_TARIFA = [
+    ("Produto", "Velocidade", "UF", "Município"),
+    ("Produto", "Velocidade", "UF"),
+    ("Produto", "Velocidade"),
+]
+
+# Valores da coluna de auditoria COLUNA_REGRA (o separar_cotações não a grava)
+REGRA_MANUAL = "Manual"
+REGRA_SEM_TARIFA = "SEM TARIFA"
+
+# --- Normalização das chaves (vetorizada) ---
+def normalizar_chave(serie, sem_espacos=False):
+    """
+    Texto comparável: sem acentos, maiúsculo e com espaços simples. Números
+    inteiros lidos como float (100.0) viram "100"; vazio vira "".
+    """
+    # As chaves se repetem muito (poucos produtos/UFs/municípios): normaliza
+    # só os valores distintos e espalha o resultado pelas linhas
+    codigos, distintos = pd.factorize(serie, use_na_sentinel=True)
+    distintos = pd.Series(distintos, dtype=object)
+
+    texto = distintos.astype("string")
+    numeros = pd.to_numeric(distintos, errors="coerce")
+    inteiros = numeros.notna() & (numeros % 1 == 0)
+    if inteiros.any():
+        texto = texto.mask(inteiros, numeros[inteiros].astype("int64").astype("string"))
+
+    texto = (
+        texto.str.normalize("NFKD")
+        .str.encode("ascii", errors="ignore")
+        .str.decode("ascii")
+        .str.upper()
+        .str.replace(r"\s+", "" if sem_espacos else " ", regex=True)
+        .str.strip()
+    )
+    # Código -1 (vazio) aponta para o "" acrescentado ao final
+    normalizados = texto.fillna("").to_numpy(dtype=object).tolist() + [""]
+    return pd.Series(pd.Series(normalizados, dtype=object).to_numpy()[codigos], index=serie.index, dtype=object)
+
+def _chaves(df, colunas):
+    # Velocidade é comparada sem espaços ("100 Mbps" == "100MBPS")
+    return {
+        chave: normalizar_chave(df[coluna], sem_espacos=(chave == "Velocidade"))
+        for chave, coluna in colunas.items()
+    }
+
+# --- Tabela de tarifas ---
+def ler_tarifas(arquivo):
+    """
+    Lê a tabela de tarifas (.xlsx/.xls ou .csv): colunas Produto, Velocidade,
+    UF e Município (UF/Município opcionais) e as colunas de preço da Mescla
+    com o mesmo nome. Retorna um DataFrame com as chaves normalizadas, a
+    regra de cada linha e a linha original ("Linha", como no Excel).
+    """
+    if os.path.splitext(arquivo)[1].lower() == ".csv":
+        df = pd.read_csv(arquivo, sep=None, engine="python", dtype=str)
+        df.columns = normalizar_cabecalhos(df.columns)
+    else:
+        df = ler_excel(arquivo)
+
+    lookup = mapa_colunas(df.columns)
+
+    faltando = [c for c in ("Produto", "Velocidade") if c.upper() not in lookup]
+    if faltando:
+        raise ValueError(f"Tabela de tarifas sem a(s) coluna(s): {', '.join(faltando)}.")
+    precos = [c for c in COLUNAS_TARIFA if c.upper() in lookup]
+    if not precos:
+        raise ValueError("Tabela de tarifas sem nenhuma coluna de mensalidade/taxa de instalação.")
+
+    tarifas = pd.DataFrame(index=df.index)
+    for chave in CHAVES_TARIFA:
+        if chave.upper() in lookup:
+            tarifas[chave] = df[lookup[chave.upper()]]
+        else:
+            tarifas[chave] = None
+    tarifas = pd.DataFrame(_chaves(tarifas, {c: c for c in CHAVES_TARIFA}))
+
+    for coluna in precos:
+        valores = df[lookup[coluna.upper()]]
+        if not pd.api.types.is_numeric_dtype(valores):
+            # Aceita "1.234,56" e "1234.56"
+            texto = valores.astype("string").str.strip()
+            virgula = texto.str.contains(",", regex=False).fillna(False)
+            texto = texto.mask(virgula, texto.str.replace(".", "", regex=False).str.replace(",", ".", regex=False))
+            valores = pd.to_numeric(texto, errors="coerce")
+        tarifas[coluna] = valores
+
+    # Linhas totalmente vazias são ignoradas
+    vazias = (tarifas[list(CHAVES_TARIFA)] == "").all(axis=1) & tarifas[precos].isna().all(axis=1)
+    tarifas = tarifas[~vazias].copy()
+    tarifas["Linha"] = tarifas.index + 2
+
+    # Regra de cada linha, pelas chaves preenchidas
+    preenchidas = tarifas[list(CHAVES_TARIFA)] != ""
+    tarifas["Regra"] = None
+    for numero, regra in enumerate(REGRAS_TARIFA):
+        mascara = preenchidas[list(regra)].all(axis=1)
+        for chave in CHAVES_TARIFA:
+            if chave not in regra:
+                mascara &= ~preenchidas[chave]
+        tarifas.loc[mascara, "Regra"] = numero
+
+    invalidas = tarifas.loc[tarifas["Regra"].isna(), "Linha"]
+    if len(invalidas):
+        raise ValueError(
+            "Linhas da tabela de tarifas com combinação de chaves inválida "
+            "(preencha Produto e Velocidade; Município exige UF): "
+            + ", ".join(str(n) for n in invalidas[:15])
+            + (f" ... e mais {len(invalidas) - 15}" if len(invalidas) > 15 else "")
+        )
+
+    for numero, regra in enumerate(REGRAS_TARIFA):
+        nivel = tarifas[tarifas["Regra"] == numero]
+        repetidas = nivel[nivel.duplicated(list(regra), keep=False)]
+        if len(repetidas):
+            raise ValueError(
+                f"Tarifas repetidas para {' + '.join(regra)} nas linhas: "
+                + ", ".join(str(n) for n in repetidas["Linha"][:15])
+            )
+
+    return tarifas
+
+# --- Precificação ---
+def precificar(mescla, tarifas, sobrescrever=False):
+    """
+    Preenche as colunas de preço da Mescla a partir das tarifas, regra por
+    regra (da mais específica para a mais geral), com um join indexado por
+    regra sobre as linhas ainda não precificadas.
+
+    Linhas que já têm algum preço são mantidas (Regra "Manual"), a não ser
+    com sobrescrever. Linhas sem tarifa ficam com Regra "SEM TARIFA".
+    Retorna a Mescla com a coluna COLUNA_REGRA ao final.
+    """
+    mescla = mescla.copy()
+    precos = [c for c in COLUNAS_TARIFA if c in tarifas.columns]
+
+    for coluna in COLUNAS_TARIFA:
+        if coluna not in mescla.columns:
+            mescla[coluna] = pd.NA
+        if not pd.api.types.is_numeric_dtype(mescla[coluna]):
+            mescla[coluna] = mescla[coluna].astype(object)
+
+    regra = pd.Series(REGRA_SEM_TARIFA, index=mescla.index, dtype=object)
+    if sobrescrever:
+        pendentes = pd.Series(True, index=mescla.index)
+    else:
+        pendentes = mescla[COLUNAS_TARIFA].isna().all(axis=1)
+        regra[~pendentes] = REGRA_MANUAL
+
+    chaves = _chaves(mescla, CHAVES_TARIFA)
+
+    for numero, campos in enumerate(REGRAS_TARIFA):
+        if not pendentes.any():
+            break
+        nivel = tarifas[tarifas["Regra"] == numero]
+        if nivel.empty:
+            continue
+
+        indice = pd.MultiIndex.from_frame(nivel[list(campos)])
+        alvo = pd.MultiIndex.from_arrays([chaves[c][pendentes].to_numpy() for c in campos])
+        posicoes = indice.get_indexer(alvo)
+
+        encontradas = posicoes >= 0
+        if not encontradas.any():
+            continue
+        linhas = mescla.index[pendentes.to_numpy()][encontradas]
+        posicoes = posicoes[encontradas]
+
+        mescla.loc[linhas, precos] = nivel[precos].to_numpy()[posicoes]
+        rotulo = " + ".join(campos)
+        regra[linhas] = [f"{rotulo} (linha {n})" for n in nivel["Linha"].to_numpy()[posicoes]]
+        pendentes[linhas] = False
+
+    mescla[COLUNA_REGRA] = regra
+    return mescla
+
+def sem_tarifa(precificada, max_itens=15):
+    """Combinações Produto/Velocidade/UF/Município sem tarifa, com a contagem."""
+    faltando = precificada[precificada[COLUNA_REGRA] == REGRA_SEM_TARIFA]
+    if faltando.empty:
+        return []
+    contagem = faltando.groupby(list(CHAVES_TARIFA.values()), dropna=False).size()
+    contagem = contagem.sort_values(ascending=False)
+    return [(tuple(chave), int(n)) for chave, n in contagem.head(max_itens).items()]
+
+# --- API ---
+def blocos_por_cotacao(df):
+    # Blocos contíguos de "Cotação", para manter a coloração da Mescla
+    cotacao = df["Cotação"]
+    grupo = (cotacao != cotacao.shift()).cumsum()
+    for _, bloco in df.groupby(grupo, sort=False):
+        yield bloco
+
+def precificar_mescla(
+    entrada,
+    tarifas,
+    saida=None,
+    sobrescrever=False,
+    limite_linhas=None,
+    fragmentar="abas"
+):
+    """
+    Precifica a Mescla entrada (inteira ou fragmentada) com a tabela de
+    tarifas e grava em saida (padrão: <Mescla>_precificada.xlsx).
+
+    Retorna {"linhas", "precificadas", "manuais", "sem_tarifa", "segundos"
+    (tempo da precificação), "saidas", "faltando": [(chaves, linhas)]}.
+    """
+    nome_base, arquivos = arquivos_da_mescla(entrada)
+    if saida is None:
+        saida = os.path.join(os.path.dirname(entrada), f"{nome_base}_precificada.xlsx")
+
+    tabela = ler_tarifas(tarifas)
+    mescla = ler_mescla(arquivos)
+
+    col_lookup = mapa_colunas(mescla.columns)
+    faltando = [c for c in list(CHAVES_TARIFA.values()) + ["Cotação"] if c.upper() not in col_lookup]
+    if faltando:
+        raise ValueError(f"Mescla sem a(s) coluna(s): {', '.join(faltando)}.")
+    mescla = mescla.rename(columns={col_lookup[c.upper()]: c for c in COLUMNS + ["Cotação"] if c.upper() in col_lookup})
+    # Uma Mescla já precificada é precificada de novo
+    mescla = mescla.drop(columns=[c for c in mescla.columns if c.upper() == COLUNA_REGRA.upper()])
+
+    inicio = time.perf_counter()
+    precificada = precificar(mescla, tabela, sobrescrever)
+    segundos = time.perf_counter() - inicio
+
+    colunas = list(precificada.columns)
+    _, linhas, saidas = escrever_mescla(
+        blocos_por_cotacao(precificada), saida, limite_linhas, fragmentar, colunas
+    )
+
+    contagem = precificada[COLUNA_REGRA].value_counts()
+    manuais = int(contagem.get(REGRA_MANUAL, 0))
+    nao_encontradas = int(contagem.get(REGRA_SEM_TARIFA, 0))
+    return {
+        "linhas": linhas,
+        "precificadas": linhas - manuais - nao_encontradas,
+        "manuais": manuais,
+        "sem_tarifa": nao_encontradas,
+        "segundos": segundos,
+        "saidas": saidas,
+        "faltando": sem_tarifa(precificada),
+    }
+
+def resumo_precificacao(resultado):
+    texto = (
+        f"{resultado['linhas']} linhas: {resultado['precificadas']} precificadas pela tarifa, "
+        f"{resultado['manuais']} mantidas (preço manual), {resultado['sem_tarifa']} sem tarifa.\n"
+        f"Arquivo(s) salvo(s): {', '.join(resultado['saidas'])}"
+    )
+    if resultado["faltando"]:
+        texto += f"\n\nSem tarifa (coluna '{COLUNA_REGRA}' = {REGRA_SEM_TARIFA}):\n" + "\n".join(
+            " / ".join("" if pd.isna(v) else str(v) for v in chave) + f": {n} linha(s)"
+            for chave, n in resultado["faltando"]
+        )
+    return texto
+
+# --- GUI de seleção ---
+def main_gui():
+    import tkinter as tk
+    from tkinter import filedialog, messagebox
+
+    root = tk.Tk()
+    root.withdraw()
+
+    entrada = filedialog.askopenfilename(
+        title="Selecione a Mescla a precificar",
+        filetypes=[("Excel", "*.xlsx *.xls *.xlsm")]
+    )
+    if not entrada:
+        print("Nenhuma Mescla selecionada.")
+        raise SystemExit
+
+    tarifas = filedialog.askopenfilename(
+        title="Selecione a tabela de tarifas",
+        filetypes=[("Excel ou CSV", "*.xlsx *.xls *.csv")]
+    )
+    if not tarifas:
+        print("Nenhuma tabela de tarifas selecionada.")
+        raise SystemExit
+
+    saida = filedialog.asksaveasfilename(
+        title="Salvar Mescla precificada como",
+        defaultextension=".xlsx",
+        filetypes=[("Excel (*.xlsx)", "*.xlsx")]
+    )
+    if not saida:
+        print("Saída não escolhida.")
+        raise SystemExit
+
+    try:
+        resultado = precificar_mescla(entrada, tarifas, saida)
+    except ValueError as e:
+        messagebox.showerror("Erro", str(e))
+        raise SystemExit
+
+    print(resumo_precificacao(resultado))
+    if resultado["sem_tarifa"]:
+        messagebox.showwarning("Concluído com linhas sem tarifa", resumo_precificacao(resultado))
+    else:
+        messagebox.showinfo("Tudo certo!", resumo_precificacao(resultado))
+
+# --- Linha de comando ---
+def main(argv=None):
+    """
+    Sem argumentos abre a seleção gráfica. Sem interface:
+      py precificar_mescla.py Mescla.xlsx --tarifas tarifas.xlsx [-o saida.xlsx]
+    Retorna 0 se todas as linhas foram precificadas, 1 se alguma ficou sem
+    tarifa e 2 em caso de erro na Mescla ou na tabela de tarifas.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        main_gui()
+        return 0
+
+    parser = argparse.ArgumentParser(
+        prog="precificar_mescla",
+        description="Preenche mensalidades e taxas de instalação da Mescla a partir de uma tabela de tarifas."
+    )
+    parser.add_argument("mescla", help="Mescla gerada pelo gerar_mescla (ou um de seus fragmentos)")
+    parser.add_argument("-t", "--tarifas", required=True, help="tabela de tarifas (.xlsx ou .csv)")
+    parser.add_argument("-o", "--saida", default=None, help="padrão: <Mescla>_precificada.xlsx")
+    parser.add_argument("--sobrescrever", action="store_true", help="reprecifica também as linhas com preço manual")
+    parser.add_argument(
+        "--limite-linhas", type=int, default=None,
+        help=f"linhas por aba/arquivo (padrão e máximo: {LIMITE_LINHAS_EXCEL})"
+    )
+    parser.add_argument(
+        "--fragmentar", choices=["abas", "arquivos"], default="abas",
+        help="como dividir a Mescla acima do limite de linhas"
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        resultado = precificar_mescla(
+            args.mescla,
+            args.tarifas,
+            args.saida,
+            args.sobrescrever,
+            args.limite_linhas,
+            args.fragmentar
+        )
+    except (OSError, ValueError) as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        return 2
+
+    print(resumo_precificacao(resultado))
+    print(f"Precificação: {resultado['segundos']:.2f}s")
+    return 1 if resultado["sem_tarifa"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,91 +3,512 @@
 # output: Cotações separadas, ver outdir/
 
 import os
-import pandas as pd
-import tkinter as tk
-from tkinter import filedialog, messagebox
+import re
+import sys
+import glob
+import json
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# planilhas.py (leitura compartilhada) fica em automation/, um nível acima
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from manifesto import arquivo_inalterado, carregar_manifesto, registro_manifesto, salvar_manifesto
+from planilhas import (
+    abrir_planilha, escrever_cabecalho, ler_excel, mapa_colunas, normalizar_cabecalho, posicao_coluna
+)
+
+# pandas e openpyxl são importados nas funções que os usam: a separação em
+# streaming não depende do pandas. O tkinter só é importado pela interface,
+# para que precificar_mescla e historico_cotacoes (que importam este módulo)
+# rodem em servidores sem Tk.
+
+# ===============================
+# Leitura da Mescla (inteira ou fragmentada)
+# ===============================
+# Mesclas grandes saem do gerar_mescla em várias abas ou em arquivos
+# numerados (<nome>_001.xlsx, <nome>_002.xlsx, ...).
+FRAGMENTO_RE = re.compile(r"^(?P<base>.+)_(?P<numero>\d{3})$")
+
+# Colunas de controle acrescentadas à Mescla (auditoria do precificar_mescla
+# e anotações do historico_cotacoes): ficam na Mescla, não vão ao portal
+COLUNA_REGRA = "Regra de preço"
+PREFIXO_HISTORICO = "Histórico - "
+
+def coluna_de_controle(nome):
+    """Cotação e colunas acrescentadas à Mescla, que não são gravadas na separação."""
+    nome = normalizar_cabecalho(nome).upper()
+    return nome in ("COTAÇÃO", COLUNA_REGRA.upper()) or nome.startswith(PREFIXO_HISTORICO.upper())
+
+def arquivos_da_mescla(arquivo_entrada):
+    """
+    Retorna (nome_base, arquivos). Se a entrada for um dos fragmentos
+    numerados, devolve todos os fragmentos do conjunto, em ordem.
+    """
+    pasta, nome = os.path.split(arquivo_entrada)
+    raiz, ext = os.path.splitext(nome)
+
+    m = FRAGMENTO_RE.match(raiz)
+    if m:
+        padrao = glob.escape(m.group("base")) + "_[0-9][0-9][0-9]" + glob.escape(ext)
+        fragmentos = sorted(glob.glob(os.path.join(pasta, padrao)))
+        if len(fragmentos) > 1:
+            return m.group("base"), fragmentos
+
+    return raiz, [arquivo_entrada]
+
+def ler_mescla(arquivos):
+    import pandas as pd
+
+    # Todas as abas com a coluna "Cotação", de todos os arquivos, em ordem
+    partes = []
+    for arquivo in arquivos:
+        for aba in ler_excel(arquivo, sheet_name=None).values():
+            if "COTAÇÃO" in mapa_colunas(aba.columns):
+                partes.append(aba)
+
+    if not partes:
+        raise ValueError("Coluna 'Cotação' não encontrada.")
+
+    return pd.concat(partes, ignore_index=True)
+
+# ===============================
+# Manifesto da separação
+# ===============================
+# O manifesto (manifesto.py) fica em outdir/<Mescla>/ e guarda, para cada
+# cotação gravada, o hash dos valores cotados (colunas de preço e
+# observações) junto com o mtime/tamanho do arquivo. Uma nova separação só
+# regrava as cotações cujo preço mudou (ou cujo arquivo foi
+# apagado/modificado fora daqui); as demais colunas vêm das cotações
+# originais e não mudam entre as rodadas de preço.
+MANIFESTO_NOME = ".manifesto_separacao.json"
+
+COLUNAS_PRECO = [
+    "Mensalidade 12 Meses líquido","Taxa de instalação líquida 12 meses",
+    "Mensalidade 24 Meses líquido","Taxa de instalação líquida 24 meses",
+    "Mensalidade 36 Meses líquido","Taxa de instalação líquida 36 meses",
+    "Mensalidade 48 Meses líquido","Taxa de instalação líquida 48 meses",
+    "Mensalidade 60 Meses líquido","Taxa de instalação líquida 60 meses","Observações"
+]
+
+def posicoes_preco(colunas):
+    """Índices das colunas de preço presentes, na ordem de COLUNAS_PRECO."""
+    posicoes = [posicao_coluna(colunas, c) for c in COLUNAS_PRECO]
+    return [p for p in posicoes if p is not None]
+
+def _valor_canonico(valor):
+    # Mesma representação para valores lidos pelo pandas e pelo openpyxl
+    # (NaN/NA/None, 199.0/199, Timestamp/datetime)
+    try:
+        if valor is None or valor != valor:
+            return None
+    except TypeError:
+        # pd.NA não tem valor de verdade
+        return None
+    if isinstance(valor, bool):
+        return valor
+    if isinstance(valor, (int, float)) or hasattr(valor, "dtype"):
+        try:
+            return float(valor)
+        except (TypeError, ValueError):
+            pass
+    if hasattr(valor, "isoformat"):
+        return valor.isoformat()
+    return str(valor)
+
+class HashPrecos:
+    """Hash incremental dos valores cotados de uma cotação, linha a linha."""
+
+    def __init__(self):
+        self._sha = hashlib.sha256()
+
+    def adicionar(self, valores):
+        linha = json.dumps([_valor_canonico(v) for v in valores], ensure_ascii=False)
+        self._sha.update(linha.encode("utf-8") + b"\n")
+
+    def hexdigest(self):
+        return self._sha.hexdigest()
 
 # ===============================
 # Processamento principal
 # ===============================
-def gerar_planilhas_por_cotacao(arquivo_entrada, outdir_base):
-    # Nome do arquivo de entrada (sem extensão)
-    nome_base = os.path.splitext(os.path.basename(arquivo_entrada))[0]
+# Gravação em paralelo: número de processos (1 grava no processo atual)
+TRABALHADORES = os.cpu_count() or 1
+
+def _gravar_grupo(caminho_saida, grupo):
+    # Executado nos processos auxiliares: o erro volta como texto
+    try:
+        grupo.to_excel(caminho_saida, index=False)
+        return None
+    except Exception as e:
+        return str(e) or type(e).__name__
+
+def _progresso_console(concluidos, total, nome_arquivo, linhas, erro):
+    # total é None quando não é conhecido de antemão (modo streaming)
+    contador = f"{concluidos}/{total}" if total is not None else f"{concluidos}"
+    if erro is None:
+        print(f"✅ [{contador}] Gerado: {nome_arquivo} ({linhas} linhas)")
+    else:
+        print(f"⚠ [{contador}] Falhou: {nome_arquivo} — {erro}")
+
+def gerar_planilhas_por_cotacao(arquivo_entrada, outdir_base, trabalhadores=None, progresso=None,
+                                incremental=True):
+    """
+    Grava uma planilha por "Cotação" em <outdir_base>/<nome da Mescla>/.
+
+    As gravações são distribuídas entre processos; progresso(concluidos,
+    total, nome_arquivo, linhas, erro) é chamado a cada arquivo terminado
+    (padrão: console). Com incremental, as cotações cujos valores cotados
+    não mudaram desde a última separação não são regravadas.
+
+    Retorna {"outdir": ..., "gerados": [(arquivo, linhas)], "inalterados":
+    [(arquivo, linhas)], "falhas": [(arquivo, motivo)]}, ordenados pelo
+    nome; "gerados" são os arquivos que precisam ser reenviados ao portal.
+    """
+    import pandas as pd
+
+    progresso = progresso or _progresso_console
+
+    # Nome do arquivo de entrada (sem extensão e sem o número do fragmento)
+    nome_base, arquivos = arquivos_da_mescla(arquivo_entrada)
 
     # Diretório final: ./outdir/<nome_arquivo_entrada>/
     outdir = os.path.join(outdir_base, nome_base)
     os.makedirs(outdir, exist_ok=True)
 
-    # Ler planilha
-    df = pd.read_excel(arquivo_entrada)
-    df.columns = df.columns.str.strip()
+    # Ler planilha (todas as abas/fragmentos)
+    df = ler_mescla(arquivos)
 
     # Localizar coluna "Cotação"
-    col_lookup = {c.upper(): c for c in df.columns}
+    col_lookup = mapa_colunas(df.columns)
     if "COTAÇÃO" not in col_lookup:
         raise ValueError("Coluna 'Cotação' não encontrada.")
 
     cot_col = col_lookup["COTAÇÃO"]
 
-    # Remover coluna Cotação do conteúdo final
-    df_sem_cotacao = df.drop(columns=[cot_col])
+    # Remover colunas Cotação e de controle do conteúdo final
+    df_sem_cotacao = df.drop(columns=[c for c in df.columns if coluna_de_controle(c)])
 
     # Agrupamento O(n)
     grupos = df_sem_cotacao.groupby(df[cot_col])
+    precos = posicoes_preco(df_sem_cotacao.columns)
 
-    total = 0
+    manifesto = carregar_manifesto(outdir, MANIFESTO_NOME) if incremental else {}
+    hashes = {}
+    inalterados = []
 
+    tarefas = []
     for cotacao, grupo in grupos:
         if pd.isna(cotacao) or str(cotacao).strip() == "":
             continue
 
         nome_arquivo = f"{str(cotacao).strip()}.xlsx"
-        caminho_saida = os.path.join(outdir, nome_arquivo)
 
-        grupo.to_excel(caminho_saida, index=False)
-        total += 1
+        hash_grupo = HashPrecos()
+        for valores in grupo.iloc[:, precos].itertuples(index=False, name=None):
+            hash_grupo.adicionar(valores)
+        hashes[nome_arquivo] = hash_grupo.hexdigest()
+        if arquivo_inalterado(outdir, nome_arquivo, hashes[nome_arquivo], manifesto):
+            inalterados.append((nome_arquivo, len(grupo)))
+            continue
 
-        print(f"✅ Gerado: {os.path.join(nome_base, nome_arquivo)} ({len(grupo)} linhas)")
+        tarefas.append((nome_arquivo, os.path.join(outdir, nome_arquivo), grupo))
 
-    messagebox.showinfo(
-        "Concluído",
-        f"{total} arquivos gerados em:\n{os.path.abspath(outdir)}"
-    )
+    gerados = []
+    falhas = []
+    total = len(tarefas)
+
+    def registrar(nome_arquivo, linhas, erro):
+        if erro is None:
+            gerados.append((nome_arquivo, linhas))
+            manifesto[nome_arquivo] = registro_manifesto(outdir, nome_arquivo, hashes[nome_arquivo])
+        else:
+            falhas.append((nome_arquivo, erro))
+            manifesto.pop(nome_arquivo, None)
+        progresso(len(gerados) + len(falhas), total, os.path.join(nome_base, nome_arquivo), linhas, erro)
+
+    trabalhadores = min(trabalhadores or TRABALHADORES, total) or 1
+    if trabalhadores <= 1:
+        for nome_arquivo, caminho_saida, grupo in tarefas:
+            registrar(nome_arquivo, len(grupo), _gravar_grupo(caminho_saida, grupo))
+    else:
+        with ProcessPoolExecutor(max_workers=trabalhadores) as executor:
+            futuros = {
+                executor.submit(_gravar_grupo, caminho_saida, grupo): (nome_arquivo, len(grupo))
+                for nome_arquivo, caminho_saida, grupo in tarefas
+            }
+            for futuro in as_completed(futuros):
+                nome_arquivo, linhas = futuros[futuro]
+                registrar(nome_arquivo, linhas, futuro.result())
+
+    salvar_manifesto(outdir, MANIFESTO_NOME, manifesto)
+
+    gerados.sort()
+    inalterados.sort()
+    falhas.sort()
+    return {
+        "outdir": os.path.abspath(outdir),
+        "gerados": gerados,
+        "inalterados": inalterados,
+        "falhas": falhas,
+    }
+
+# ===============================
+# Separação em streaming
+# ===============================
+class _MesclaNaoContigua(Exception):
+    """Uma cotação reaparece depois que seu arquivo já foi fechado."""
+
+def _separar_streaming(arquivos, nome_base, outdir, progresso, manifesto):
+    from datetime import date, datetime
+    from openpyxl import Workbook
+    from openpyxl.cell.cell import WriteOnlyCell
+
+    # Mesmos formatos que o pandas.to_excel aplica a datas
+    formatos_data = {datetime: "YYYY-MM-DD HH:MM:SS", date: "YYYY-MM-DD"}
+
+    def celula(ws, valor):
+        formato = formatos_data.get(type(valor))
+        if formato is None:
+            return valor
+        cell = WriteOnlyCell(ws, value=valor)
+        cell.number_format = formato
+        return cell
+
+    gerados = []
+    inalterados = []
+    falhas = []
+    fechadas = set()
+    # Escritor da cotação em andamento: [nome_arquivo, wb, ws, linhas, hash]
+    atual = None
+
+    def abrir(nome_arquivo, cabecalho):
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("Sheet1")
+        escrever_cabecalho(ws, cabecalho)
+        return [nome_arquivo, wb, ws, 0, HashPrecos()]
+
+    def fechar(escritor):
+        nome_arquivo, wb, ws, linhas, hash_grupo = escritor
+        fechadas.add(nome_arquivo)
+        hash_precos = hash_grupo.hexdigest()
+        if arquivo_inalterado(outdir, nome_arquivo, hash_precos, manifesto):
+            # Descarta o que já foi escrito na aba temporária
+            ws.close()
+            inalterados.append((nome_arquivo, linhas))
+            return
+        try:
+            wb.save(os.path.join(outdir, nome_arquivo))
+            erro = None
+            gerados.append((nome_arquivo, linhas))
+            manifesto[nome_arquivo] = registro_manifesto(outdir, nome_arquivo, hash_precos)
+        except Exception as e:
+            erro = str(e) or type(e).__name__
+            falhas.append((nome_arquivo, erro))
+            manifesto.pop(nome_arquivo, None)
+        progresso(len(gerados) + len(falhas), None, os.path.join(nome_base, nome_arquivo), linhas, erro)
+
+    try:
+        for arquivo in arquivos:
+            with abrir_planilha(arquivo) as abas:
+                for _, linhas in abas:
+                    cabecalho = [normalizar_cabecalho(c) for c in next(linhas, ())]
+                    while cabecalho and not cabecalho[-1]:
+                        cabecalho.pop()
+
+                    # Abas sem a coluna "Cotação" não fazem parte da Mescla
+                    pos_cot = posicao_coluna(cabecalho, "Cotação")
+                    if pos_cot is None:
+                        continue
+                    # Remover colunas Cotação e de controle do conteúdo final
+                    colunas = [i for i, c in enumerate(cabecalho) if not coluna_de_controle(c)]
+                    cabecalho_saida = [cabecalho[i] for i in colunas]
+                    precos = [colunas[i] for i in posicoes_preco(cabecalho_saida)]
+
+                    for valores in linhas:
+                        cotacao = valores[pos_cot] if pos_cot < len(valores) else None
+                        if cotacao is None or str(cotacao).strip() == "":
+                            continue
+
+                        nome_arquivo = f"{str(cotacao).strip()}.xlsx"
+                        if atual is None or atual[0] != nome_arquivo:
+                            if nome_arquivo in fechadas:
+                                raise _MesclaNaoContigua(nome_arquivo)
+                            if atual is not None:
+                                fechar(atual)
+                            atual = abrir(nome_arquivo, cabecalho_saida)
+
+                        ws = atual[2]
+                        ws.append([celula(ws, valores[i]) if i < len(valores) else None for i in colunas])
+                        atual[3] += 1
+                        atual[4].adicionar([valores[i] if i < len(valores) else None for i in precos])
+
+        if atual is not None:
+            fechar(atual)
+            atual = None
+    finally:
+        if atual is not None:
+            # Interrompido no meio: descarta a aba temporária aberta
+            atual[2].close()
+
+    gerados.sort()
+    inalterados.sort()
+    falhas.sort()
+    return {
+        "outdir": os.path.abspath(outdir),
+        "gerados": gerados,
+        "inalterados": inalterados,
+        "falhas": falhas,
+    }
+
+def separar_mescla_streaming(arquivo_entrada, outdir_base, progresso=None, incremental=True):
+    """
+    Mesmo resultado de gerar_planilhas_por_cotacao, lendo a Mescla linha a
+    linha (somente leitura) e gravando cada cotação direto em um workbook
+    write-only, sem pandas e com memória constante.
+
+    As linhas de cada cotação precisam estar contíguas, como o gerar_mescla
+    as produz; só o arquivo da cotação em andamento fica aberto. Se uma
+    cotação reaparecer mais adiante (Mescla reordenada), a separação é
+    refeita por gerar_planilhas_por_cotacao.
+    """
+    progresso = progresso or _progresso_console
+
+    # Nome do arquivo de entrada (sem extensão e sem o número do fragmento)
+    nome_base, arquivos = arquivos_da_mescla(arquivo_entrada)
+
+    # Diretório final: ./outdir/<nome_arquivo_entrada>/
+    outdir = os.path.join(outdir_base, nome_base)
+    os.makedirs(outdir, exist_ok=True)
+
+    manifesto = carregar_manifesto(outdir, MANIFESTO_NOME) if incremental else {}
+    try:
+        resultado = _separar_streaming(arquivos, nome_base, outdir, progresso, manifesto)
+    except _MesclaNaoContigua as e:
+        print(f"⚠ Cotação '{e}' fora de ordem na Mescla; separando com pandas.")
+        return gerar_planilhas_por_cotacao(
+            arquivo_entrada, outdir_base, progresso=progresso, incremental=incremental
+        )
+
+    if not any(resultado[k] for k in ("gerados", "inalterados", "falhas")):
+        raise ValueError("Coluna 'Cotação' não encontrada.")
+    salvar_manifesto(outdir, MANIFESTO_NOME, manifesto)
+    return resultado
+
+def resumo_separacao(resultado, max_falhas=15):
+    gerados = resultado["gerados"]
+    texto = f"{len(gerados)} arquivos gerados em:\n{resultado['outdir']}"
+    inalterados = resultado.get("inalterados", [])
+    if inalterados:
+        # Só os arquivos regravados precisam ser reenviados ao portal
+        texto += f"\n\n{len(inalterados)} cotação(ões) sem alteração de preço (não regravadas)."
+        if gerados:
+            texto += "\n\nAlterados (reenviar):\n" + "\n".join(
+                nome for nome, _ in gerados[:max_falhas]
+            )
+            if len(gerados) > max_falhas:
+                texto += f"\n... e mais {len(gerados) - max_falhas} (ver console)"
+    falhas = resultado["falhas"]
+    if falhas:
+        texto += f"\n\n{len(falhas)} arquivo(s) com falha:\n" + "\n".join(
+            f"{nome}: {motivo}" for nome, motivo in falhas[:max_falhas]
+        )
+        if len(falhas) > max_falhas:
+            texto += f"\n... e mais {len(falhas) - max_falhas} (ver console)"
+    return texto
 
 # ===============================
 # GUI mínima
 # ===============================
 def escolher_arquivo():
+    from tkinter import filedialog
+
     entrada_arquivo.set(
         filedialog.askopenfilename(filetypes=[("Excel", "*.xlsx *.xls *.xlsm")])
     )
 
 def executar():
+    from tkinter import messagebox
+
     if not entrada_arquivo.get():
         messagebox.showwarning("Aviso", "Selecione o arquivo de entrada.")
         return
 
+    def progresso(concluidos, total, nome_arquivo, linhas, erro):
+        _progresso_console(concluidos, total, nome_arquivo, linhas, erro)
+        # No modo streaming o total só é conhecido ao final
+        status.set(f"{concluidos}/{total} arquivos" if total is not None else f"{concluidos} arquivos")
+        root.update_idletasks()
+
+    separar = separar_mescla_streaming if modo_streaming.get() else gerar_planilhas_por_cotacao
+
     try:
-        gerar_planilhas_por_cotacao(
+        resultado = separar(
             entrada_arquivo.get(),
-            "../../outdir"
+            "../../outdir",
+            progresso=progresso,
+            incremental=not regravar_todos.get()
         )
     except Exception as e:
         messagebox.showerror("Erro", str(e))
+        return
+
+    resumo = resumo_separacao(resultado)
+    if registrar_historico.get() and resultado["gerados"]:
+        # Alimenta o histórico usado para reaproveitar preços por proximidade
+        from historico_cotacoes import registrar_separacao
+        try:
+            historico = registrar_separacao(resultado)
+            resumo += f"\n\n{historico['pontos']} ponto(s) registrado(s) no histórico de cotações."
+        except Exception as e:
+            resumo += f"\n\n⚠ Histórico de cotações não atualizado: {e}"
+
+    if resultado["falhas"]:
+        messagebox.showwarning("Concluído com falhas", resumo)
+    else:
+        messagebox.showinfo("Concluído", resumo)
 
 # ===============================
 # Interface
 # ===============================
-root = tk.Tk()
-root.title("Gerador de Planilhas por Cotação")
+# Sob o guard: os processos de gravação reimportam este módulo (spawn no
+# Windows) e não podem abrir a interface novamente.
+if __name__ == "__main__":
+    import tkinter as tk
+
+    root = tk.Tk()
+    root.title("Gerador de Planilhas por Cotação")
+
+    entrada_arquivo = tk.StringVar()
+    modo_streaming = tk.BooleanVar(value=False)
+    regravar_todos = tk.BooleanVar(value=False)
+    registrar_historico = tk.BooleanVar(value=True)
+    status = tk.StringVar()
+
+    tk.Label(root, text="Arquivo Excel de entrada:").grid(row=0, column=0, sticky="w")
+    tk.Entry(root, textvariable=entrada_arquivo, width=50).grid(row=0, column=1)
+    tk.Button(root, text="Procurar", command=escolher_arquivo).grid(row=0, column=2)
+
+    tk.Checkbutton(
+        root,
+        text="Modo streaming (Mesclas muito grandes, pouca memória)",
+        variable=modo_streaming
+    ).grid(row=1, column=0, columnspan=3, sticky="w")
+
+    tk.Checkbutton(
+        root,
+        text="Regravar todas as cotações (mesmo sem alteração de preço)",
+        variable=regravar_todos
+    ).grid(row=2, column=0, columnspan=3, sticky="w")
 
-entrada_arquivo = tk.StringVar()
+    tk.Checkbutton(
+        root,
+        text="Registrar no histórico de cotações (reaproveitamento de preços)",
+        variable=registrar_historico
+    ).grid(row=3, column=0, columnspan=3, sticky="w")
 
-tk.Label(root, text="Arquivo Excel de entrada:").grid(row=0, column=0, sticky="w")
-tk.Entry(root, textvariable=entrada_arquivo, width=50).grid(row=0, column=1)
-tk.Button(root, text="Procurar", command=escolher_arquivo).grid(row=0, column=2)
+    tk.Button(root, text="Gerar Arquivos", bg="green", fg="white", command=executar)\
+        .grid(row=4, column=0, columnspan=3, pady=10)
 
-tk.Button(root, text="Gerar Arquivos", bg="green", fg="white", command=executar)\
-    .grid(row=1, column=0, columnspan=3, pady=10)
+    tk.Label(root, textvariable=status).grid(row=5, column=0, columnspan=3)
 
-root.mainloop()
+    root.mainloop()